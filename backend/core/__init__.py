@@ -1,3 +1,4 @@
 """Core package for AutoOD"""
 
-__all__ = ['ModelManager', 'Detector', 'AutoLabeler', 'Exporter']
+__all__ = ['ModelManager', 'Detector', 'AutoLabeler', 'Exporter', 'PipelineRunner',
+           'CUDAGraphRunner', 'OnnxYOLO', 'PinnedFrameUploader']
@@ -0,0 +1,53 @@
+"""Numba-compiled box rasterization kernels (optional; requires numba)"""
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:  # pragma: no cover - optional dependency
+    NUMBA_AVAILABLE = False
+
+
+if NUMBA_AVAILABLE:
+    @njit(inline="always")
+    def _fill(img, x_lo, y_lo, x_hi, y_hi, color):
+        """Fill the inclusive pixel range, clipped to the image"""
+        x_lo = max(x_lo, 0)
+        y_lo = max(y_lo, 0)
+        x_hi = min(x_hi, img.shape[1] - 1)
+        y_hi = min(y_hi, img.shape[0] - 1)
+        for y in range(y_lo, y_hi + 1):
+            for x in range(x_lo, x_hi + 1):
+                for c in range(img.shape[2]):
+                    img[y, x, c] = color[c]
+
+    @njit(parallel=True, cache=True)
+    def draw_rects(img, boxes, color, thickness):
+        """
+        Draw rectangle outlines for all boxes in place, one box per thread
+
+        Each edge is a band `thickness` pixels wide centred on the box edge,
+        like cv2.rectangle. Overlapping boxes write the same color, so
+        concurrent writes to a shared pixel are harmless.
+        """
+        lo = thickness // 2
+        hi = thickness - 1 - lo
+        for i in prange(boxes.shape[0]):
+            x1 = boxes[i, 0]
+            y1 = boxes[i, 1]
+            x2 = boxes[i, 2]
+            y2 = boxes[i, 3]
+            _fill(img, x1 - lo, y1 - lo, x2 + hi, y1 + hi, color)
+            _fill(img, x1 - lo, y2 - lo, x2 + hi, y2 + hi, color)
+            _fill(img, x1 - lo, y1 - lo, x1 + hi, y2 + hi, color)
+            _fill(img, x2 - lo, y1 - lo, x2 + hi, y2 + hi, color)
+        return img
+
+    @njit(parallel=True, cache=True)
+    def fill_rects(img, boxes, color):
+        """Fill all boxes (inclusive x1, y1, x2, y2) in place"""
+        for i in prange(boxes.shape[0]):
+            _fill(img, boxes[i, 0], boxes[i, 1], boxes[i, 2], boxes[i, 3], color)
+        return img
+else:
+    draw_rects = None
+    fill_rects = None
@@ -0,0 +1,35 @@
+"""Numba-compiled IoU kernels (optional; requires numba)"""
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:  # pragma: no cover - optional dependency
+    NUMBA_AVAILABLE = False
+
+
+if NUMBA_AVAILABLE:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def pairwise_iou(b1, b2, out):
+        """Fill out[i, j] with the IoU of b1[i] and b2[j] without temporaries"""
+        for i in prange(b1.shape[0]):
+            x1_1 = b1[i, 0]
+            y1_1 = b1[i, 1]
+            x2_1 = b1[i, 2]
+            y2_1 = b1[i, 3]
+            area1 = (x2_1 - x1_1) * (y2_1 - y1_1)
+            for j in range(b2.shape[0]):
+                iw = min(x2_1, b2[j, 2]) - max(x1_1, b2[j, 0])
+                if iw <= 0:
+                    out[i, j] = 0.0
+                    continue
+                ih = min(y2_1, b2[j, 3]) - max(y1_1, b2[j, 1])
+                if ih <= 0:
+                    out[i, j] = 0.0
+                    continue
+                intersection = iw * ih
+                area2 = (b2[j, 2] - b2[j, 0]) * (b2[j, 3] - b2[j, 1])
+                union = area1 + area2 - intersection
+                out[i, j] = intersection / union if union > 0 else 0.0
+        return out
+else:
+    pairwise_iou = None
@@ -0,0 +1,52 @@
+"""Numba-compiled letterbox preprocessing kernel (optional; requires numba)"""
+import numpy as np
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:  # pragma: no cover - optional dependency
+    NUMBA_AVAILABLE = False
+
+
+if NUMBA_AVAILABLE:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def letterbox_chw(src, dst, new_h, new_w, pad_value):
+        """
+        Letterbox a BGR uint8 (H, W, 3) image into a float32 (3, S, S) RGB slot
+
+        One pass over the output, one row per thread: bilinear resize to
+        (new_h, new_w) with OpenCV's half-pixel sampling, BGR -> RGB, scaling
+        to 0-1, and pad_value for the bottom/right border.
+        """
+        height, width = src.shape[0], src.shape[1]
+        out_h, out_w = dst.shape[1], dst.shape[2]
+        scale_y = height / new_h
+        scale_x = width / new_w
+        inv = np.float32(1.0 / 255.0)
+        for y in prange(out_h):
+            if y >= new_h:
+                for c in range(3):
+                    for x in range(out_w):
+                        dst[c, y, x] = pad_value
+                continue
+            fy = max((y + 0.5) * scale_y - 0.5, 0.0)
+            y0 = min(int(fy), height - 1)
+            y1 = min(y0 + 1, height - 1)
+            wy = fy - y0
+            for x in range(out_w):
+                if x >= new_w:
+                    for c in range(3):
+                        dst[c, y, x] = pad_value
+                    continue
+                fx = max((x + 0.5) * scale_x - 0.5, 0.0)
+                x0 = min(int(fx), width - 1)
+                x1 = min(x0 + 1, width - 1)
+                wx = fx - x0
+                for c in range(3):
+                    channel = 2 - c
+                    top = src[y0, x0, channel] * (1.0 - wx) + src[y0, x1, channel] * wx
+                    bottom = src[y1, x0, channel] * (1.0 - wx) + src[y1, x1, channel] * wx
+                    dst[c, y, x] = (top * (1.0 - wy) + bottom * wy) * inv
+        return dst
+else:
+    letterbox_chw = None
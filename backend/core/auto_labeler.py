@@ -1,16 +1,52 @@
 """Auto-labeling Engine - Propagate annotations from minimal examples"""
-from typing import List, Dict, Optional
+from typing import List, Dict
+import multiprocessing
 import numpy as np
+import torch
+
+from ._iou_kernels import NUMBA_AVAILABLE, pairwise_iou
+
+
+# Detector owned by each CPU worker process, set up by _init_worker
+_worker_detector = None
+
+
+def _init_worker(models_dir: str, model_name: str):
+    """
+    Pin Torch to one intra-op thread and load the model once per worker
+    
+    Workers stay on the PyTorch weights: an onnxruntime or OpenVINO session
+    would start a thread per core in every worker regardless.
+    """
+    global _worker_detector
+    from .model_manager import ModelManager
+    from .detector import Detector
+    
+    torch.set_num_threads(1)
+    model_manager = ModelManager(models_dir, export=False)
+    model_manager.load_model(model_name)
+    _worker_detector = Detector(model_manager)
+
+
+def _detect_one(image, model_name: str, conf: float, class_filter: List[str]) -> List[Dict]:
+    """Run detection on a single image inside a worker process"""
+    return _worker_detector.detect_objects(image, model_name, conf=conf, class_filter=class_filter)
 
 
 class AutoLabeler:
     """Intelligent auto-labeling from 1-2 manual annotations"""
     
+    # Below this many auto x manual pairs, scalar IoU beats the NumPy path
+    SCALAR_IOU_MAX_PAIRS = 64
+    # Above this many pairs, the fused Numba kernel beats NumPy broadcasting
+    NUMBA_IOU_MIN_PAIRS = 10000
+    
     def __init__(self, detector):
         self.detector = detector
     
     def auto_label_images(self, images: List, manual_annotations: List[Dict],
-                         model_name: str, conf: float = 0.25) -> Dict[int, List[Dict]]:
+                         model_name: str, conf: float = 0.25,
+                         batch_size: int = 8, num_workers: int = 1) -> Dict[int, List[Dict]]:
         """
         Auto-label multiple images based on manual annotations
         
@@ -19,6 +55,9 @@ class AutoLabeler:
             manual_annotations: List of manual annotations with class names
             model_name: YOLO model to use
             conf: Confidence threshold
+            batch_size: Number of images per forward pass
+            num_workers: Worker processes for CPU-only inference (1 = in-process);
+                ignored when CUDA is available, which uses batched inference
         
         Returns:
             Dict mapping image_index -> list of detections
@@ -26,15 +65,40 @@ class AutoLabeler:
         # Extract classes from manual annotations
         target_classes = list(set([ann['class'] for ann in manual_annotations]))
         
+        if num_workers > 1 and not torch.cuda.is_available():
+            return self._auto_label_images_parallel(
+                images, model_name, conf, target_classes, num_workers
+            )
+        
         all_detections = {}
-        for idx, image in enumerate(images):
-            detections = self.detector.detect_objects(
-                image, model_name, conf=conf, class_filter=target_classes
+        for start in range(0, len(images), batch_size):
+            batch = images[start:start + batch_size]
+            batch_detections = self.detector.detect_objects_batch(
+                batch, model_name, conf=conf, class_filter=target_classes
             )
-            all_detections[idx] = detections
+            for offset, detections in enumerate(batch_detections):
+                all_detections[start + offset] = detections
         
         return all_detections
     
+    def _auto_label_images_parallel(self, images: List, model_name: str, conf: float,
+                                    target_classes: List[str],
+                                    num_workers: int) -> Dict[int, List[Dict]]:
+        """Detect across a process pool with one Torch thread per worker"""
+        model_manager = self.detector.model_manager
+        models_dir = str(model_manager.models_dir)
+        # Download the weights once here, so the workers don't race on the file
+        model_manager.load_model(model_name)
+        ctx = multiprocessing.get_context('spawn')
+        with ctx.Pool(num_workers, initializer=_init_worker,
+                      initargs=(models_dir, model_name)) as pool:
+            results = pool.starmap(
+                _detect_one,
+                [(image, model_name, conf, target_classes) for image in images]
+            )
+        
+        return dict(enumerate(results))
+    
     def auto_label_video(self, video_path: str, manual_annotations: List[Dict],
                         model_name: str, conf: float = 0.25, 
                         sample_rate: int = 1) -> Dict[int, List[Dict]]:
@@ -77,38 +141,90 @@ class AutoLabeler:
             Merged list of annotations
         """
         merged = manual_annotations.copy()
-        
-        for auto_det in auto_detections:
-            # Check if overlaps with any manual annotation
-            overlaps = False
-            for manual_det in manual_annotations:
-                iou = self._calculate_iou(auto_det['bbox'], manual_det['bbox'])
-                if iou > iou_threshold:
-                    overlaps = True
-                    break
-            
-            # Add if no overlap
-            if not overlaps:
-                merged.append(auto_det)
+        if not auto_detections:
+            return merged
+        if not manual_annotations:
+            merged.extend(auto_detections)
+            return merged
+        
+        # Small inputs (the 1-2 manual example case) don't amortize array setup
+        if len(auto_detections) * len(manual_annotations) < self.SCALAR_IOU_MAX_PAIRS:
+            iou = self._calculate_iou
+            manual_bboxes = [manual_det['bbox'] for manual_det in manual_annotations]
+            for auto_det in auto_detections:
+                # Add if no overlap with any manual annotation
+                bbox = auto_det['bbox']
+                if not any(iou(bbox, manual_bbox) > iou_threshold for manual_bbox in manual_bboxes):
+                    merged.append(auto_det)
+            return merged
+        
+        auto_soa = self._detections_to_soa(auto_detections)
+        manual_soa = self._detections_to_soa(manual_annotations)
+        iou_mat = self._pairwise_iou(auto_soa['bbox'], manual_soa['bbox'])
+        
+        # Add auto detections that don't overlap any manual annotation
+        keep = iou_mat.max(axis=1) <= iou_threshold
+        auto_meta = auto_soa['meta']
+        merged.extend(auto_meta[i] for i in np.flatnonzero(keep))
         
         return merged
     
+    @staticmethod
+    def _detections_to_soa(detections: List[Dict]) -> Dict:
+        """
+        Convert detection dicts to structure-of-arrays form
+        
+        Returns:
+            {'bbox': (N, 4) float64, 'meta': the source dicts, for the other fields}
+        """
+        return {
+            'bbox': np.array([det['bbox'] for det in detections], dtype=np.float64).reshape(-1, 4),
+            'meta': detections,
+        }
+    
+    @staticmethod
+    def _pairwise_iou(boxes1: np.ndarray, boxes2: np.ndarray) -> np.ndarray:
+        """
+        Calculate IoU between every pair of bboxes
+        
+        Args:
+            boxes1: (N, 4) array of [x1, y1, x2, y2]
+            boxes2: (M, 4) array of [x1, y1, x2, y2]
+        
+        Returns:
+            (N, M) IoU matrix
+        """
+        if NUMBA_AVAILABLE and len(boxes1) * len(boxes2) > AutoLabeler.NUMBA_IOU_MIN_PAIRS:
+            out = np.empty((len(boxes1), len(boxes2)), dtype=np.float64)
+            return pairwise_iou(np.ascontiguousarray(boxes1, dtype=np.float64),
+                                np.ascontiguousarray(boxes2, dtype=np.float64), out)
+        
+        tl = np.maximum(boxes1[:, None, :2], boxes2[:, :2])
+        br = np.minimum(boxes1[:, None, 2:], boxes2[:, 2:])
+        intersection = np.prod(np.clip(br - tl, 0, None), axis=2)
+        
+        area1 = np.prod(boxes1[:, 2:] - boxes1[:, :2], axis=1)
+        area2 = np.prod(boxes2[:, 2:] - boxes2[:, :2], axis=1)
+        union = area1[:, None] + area2 - intersection
+        
+        return np.divide(intersection, union, out=np.zeros_like(intersection), where=union > 0)
+    
     @staticmethod
     def _calculate_iou(bbox1: List[float], bbox2: List[float]) -> float:
         """Calculate Intersection over Union between two bboxes"""
         x1_1, y1_1, x2_1, y2_1 = bbox1
         x1_2, y1_2, x2_2, y2_2 = bbox2
         
-        # Intersection area
-        x1_i = max(x1_1, x1_2)
-        y1_i = max(y1_1, y1_2)
-        x2_i = min(x2_1, x2_2)
-        y2_i = min(y2_1, y2_2)
+        # Intersection width; x-disjoint boxes skip the y computation
+        iw = min(x2_1, x2_2) - max(x1_1, x1_2)
+        if iw <= 0:
+            return 0.0
         
-        if x2_i < x1_i or y2_i < y1_i:
+        ih = min(y2_1, y2_2) - max(y1_1, y1_2)
+        if ih <= 0:
             return 0.0
         
-        intersection = (x2_i - x1_i) * (y2_i - y1_i)
+        intersection = iw * ih
         
         # Union area
         area1 = (x2_1 - x1_1) * (y2_1 - y1_1)
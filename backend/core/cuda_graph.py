@@ -0,0 +1,60 @@
+"""CUDA graph capture and replay for fixed-shape inference batches"""
+from collections import OrderedDict
+from typing import Callable, Tuple
+
+import torch
+
+
+class CUDAGraphRunner:
+    """
+    Replay a captured CUDA graph of fn(x) for every input shape seen before
+
+    The first call with a given (shape, dtype) warms fn up on a side stream
+    and captures it; later calls copy the input into the captured static
+    buffer and replay the whole forward as a single launch. Callers must pad
+    partial batches up to the captured shape to hit the cache.
+
+    The returned tensor is the graph's static output and is overwritten by
+    the next replay, so consume (or clone) it before calling again.
+    """
+
+    def __init__(self, fn: Callable[[torch.Tensor], torch.Tensor], max_graphs: int = 4,
+                 warmup_iters: int = 3):
+        self.fn = fn
+        self.max_graphs = max_graphs
+        self.warmup_iters = warmup_iters
+        self._graphs: "OrderedDict[Tuple, Tuple[torch.Tensor, torch.Tensor, torch.cuda.CUDAGraph]]" = OrderedDict()
+
+    @torch.no_grad()
+    def __call__(self, x: torch.Tensor) -> torch.Tensor:
+        key = (tuple(x.shape), x.dtype)
+        entry = self._graphs.get(key)
+        if entry is None:
+            entry = self._capture(x)
+            self._graphs[key] = entry
+            if len(self._graphs) > self.max_graphs:
+                self._graphs.popitem(last=False)
+        else:
+            self._graphs.move_to_end(key)
+
+        static_input, static_output, graph = entry
+        static_input.copy_(x)
+        graph.replay()
+        return static_output
+
+    def _capture(self, x: torch.Tensor):
+        static_input = x.clone()
+
+        # Warm up on a side stream so lazy init (cuDNN autotuning, allocator
+        # growth) happens outside the capture
+        stream = torch.cuda.Stream()
+        stream.wait_stream(torch.cuda.current_stream())
+        with torch.cuda.stream(stream):
+            for _ in range(self.warmup_iters):
+                self.fn(static_input)
+        torch.cuda.current_stream().wait_stream(stream)
+
+        graph = torch.cuda.CUDAGraph()
+        with torch.cuda.graph(graph):
+            static_output = self.fn(static_input)
+        return static_input, static_output, graph
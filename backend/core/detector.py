@@ -1,8 +1,31 @@
 """Object Detection Engine"""
+import os
+import queue
+import threading
+from itertools import repeat
+from multiprocessing.pool import ThreadPool
 import cv2
 import numpy as np
+import torch
 from typing import List, Dict, Optional, Tuple
 from pathlib import Path
+from ultralytics.data.augment import LetterBox
+from ultralytics.utils import ops
+
+from .frame_uploader import PinnedFrameUploader
+
+
+# Per-image post-processing pool shared by every Detector, created on first use
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _postprocess_pool() -> ThreadPool:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPool(os.cpu_count() or 1)
+        return _pool
 
 
 class Detector:
@@ -11,6 +34,11 @@ class Detector:
     def __init__(self, model_manager):
         self.model_manager = model_manager
     
+    @property
+    def pool(self) -> ThreadPool:
+        """Thread pool for per-image post-processing, shared across Detectors"""
+        return _postprocess_pool()
+    
     def detect_objects(self, image, model_name: str, conf: float = 0.25, 
                       class_filter: Optional[List[str]] = None) -> List[Dict]:
         """
@@ -25,75 +53,236 @@ class Detector:
         
         detections = []
         for result in results:
-            boxes = result.boxes
-            for i in range(len(boxes)):
-                # Get class name
-                class_id = int(boxes.cls[i])
-                class_name = result.names[class_id]
-                
-                # Filter by class if specified
-                if class_filter and class_name not in class_filter:
-                    continue
-                
-                # Get bbox coordinates (xyxy format)
-                bbox = boxes.xyxy[i].cpu().numpy().tolist()
-                confidence = float(boxes.conf[i])
-                
-                detections.append({
-                    'class': class_name,
-                    'confidence': confidence,
-                    'bbox': bbox  # [x1, y1, x2, y2]
-                })
+            detections.extend(self._postprocess_result(result, class_filter))
         
         return detections
     
+    def detect_objects_batch(self, images: List, model_name: str, conf: float = 0.25,
+                             class_filter: Optional[List[str]] = None) -> List[List[Dict]]:
+        """
+        Detect objects in a batch of images with a single forward pass
+        
+        Args:
+            images: List of images (numpy arrays); Ultralytics batches lists natively
+        
+        Returns:
+            List of per-image detection lists, in the same order as `images`
+        """
+        if not images:
+            return []
+        
+        results = self.model_manager.predict(model_name, list(images), conf=conf, verbose=False)
+        if len(results) == 1:
+            return [self._postprocess_result(results[0], class_filter)]
+        return self.pool.starmap(self._postprocess_result, zip(results, repeat(class_filter)))
+    
+    def detect_staged_batch(self, staged: Tuple[torch.Tensor, torch.cuda.Event],
+                            orig_shapes: List[Tuple[int, int]], model_name: str,
+                            conf: float = 0.25,
+                            class_filter: Optional[List[str]] = None) -> List[List[Dict]]:
+        """
+        Detect objects in a batch already uploaded by PinnedFrameUploader
+        
+        Args:
+            staged: (letterboxed uint8 NHWC device tensor, copy-complete event)
+            orig_shapes: (height, width) of each source frame, to map boxes back
+        
+        Returns:
+            List of per-image detection lists, in the same order as the batch
+        """
+        batch, copied = staged
+        stream = torch.cuda.current_stream()
+        stream.wait_event(copied)
+        batch.record_stream(stream)
+        
+        # BGR uint8 NHWC -> RGB float NCHW in [0, 1]
+        tensor = batch.flip(-1).permute(0, 3, 1, 2).contiguous().float().div_(255)
+        results = self.model_manager.predict(model_name, tensor, conf=conf, verbose=False)
+        return self.pool.starmap(
+            self._postprocess_result, zip(results, repeat(class_filter), orig_shapes)
+        )
+    
+    @staticmethod
+    def _postprocess_result(result, class_filter: Optional[List[str]] = None,
+                            orig_shape: Optional[Tuple[int, int]] = None) -> List[Dict]:
+        """
+        Convert a single Ultralytics result into detection dicts
+        
+        Args:
+            orig_shape: (height, width) of the source image when the model ran on
+                a letterboxed copy; boxes are scaled back to it
+        """
+        boxes = result.boxes
+        if boxes is None or len(boxes) == 0:
+            return []
+        
+        # One device->host transfer per tensor instead of one per box
+        xyxy = boxes.xyxy.cpu().numpy()
+        if orig_shape is not None:
+            xyxy = ops.scale_boxes(result.orig_shape, xyxy, orig_shape)
+        confs = boxes.conf.cpu().numpy()
+        class_ids = boxes.cls.cpu().numpy().astype(int)
+        class_names = [result.names[class_id] for class_id in class_ids]
+        
+        # Filter by class if specified
+        if class_filter:
+            class_mask = np.isin(class_names, class_filter)
+            xyxy = xyxy[class_mask]
+            confs = confs[class_mask]
+            class_names = [name for name, kept in zip(class_names, class_mask) if kept]
+        
+        return [
+            {
+                'class': class_name,
+                'confidence': confidence,
+                'bbox': bbox  # [x1, y1, x2, y2]
+            }
+            for class_name, confidence, bbox in zip(class_names, confs.tolist(), xyxy.tolist())
+        ]
+    
     def detect_video_frames(self, video_path: str, model_name: str, 
                            conf: float = 0.25, class_filter: Optional[List[str]] = None,
-                           sample_rate: int = 1) -> Dict[int, List[Dict]]:
+                           sample_rate: int = 1, batch_size: int = 8,
+                           prefetch: int = 32) -> Dict[int, List[Dict]]:
         """
         Detect objects in video frames
         
+        Decoding runs on a reader thread and result collection on a collector
+        thread, so frame N+1 is decoded while frame N is being inferred.
+        Inference and post-processing stay on the calling thread.
+        
         Args:
             sample_rate: Process every Nth frame (1 = all frames)
+            batch_size: Number of sampled frames per forward pass
+            prefetch: Maximum number of decoded frames buffered ahead of inference
         
         Returns:
             Dict mapping frame_number -> list of detections
         """
-        cap = cv2.VideoCapture(video_path)
         frame_detections = {}
-        frame_num = 0
+        read_q = queue.Queue(maxsize=prefetch)
+        write_q = queue.Queue()
+        stop = threading.Event()
         
-        while cap.isOpened():
-            ret, frame = cap.read()
-            if not ret:
-                break
-            
-            # Sample frames
-            if frame_num % sample_rate == 0:
-                detections = self.detect_objects(frame, model_name, conf, class_filter)
-                frame_detections[frame_num] = detections
+        def reader():
+            # Request hardware decode when the OpenCV build supports it
+            cap = cv2.VideoCapture(video_path, cv2.CAP_ANY,
+                                   [cv2.CAP_PROP_HW_ACCELERATION, cv2.VIDEO_ACCELERATION_ANY])
+            frame_num = 0
+            try:
+                while cap.isOpened() and not stop.is_set():
+                    # grab() only demuxes; frames are decoded by retrieve() when sampled
+                    if not cap.grab():
+                        break
+                    
+                    # Sample frames
+                    if frame_num % sample_rate == 0:
+                        ret, frame = cap.retrieve()
+                        if not ret:
+                            break
+                        read_q.put((frame_num, frame))
+                    
+                    frame_num += 1
+            finally:
+                cap.release()
+                read_q.put(None)
+        
+        def collector():
+            while True:
+                item = write_q.get()
+                if item is None:
+                    break
+                frame_nums, batch_detections = item
+                for num, detections in zip(frame_nums, batch_detections):
+                    frame_detections[num] = detections
+        
+        reader_thread = threading.Thread(target=reader, daemon=True)
+        collector_thread = threading.Thread(target=collector, daemon=True)
+        reader_thread.start()
+        collector_thread.start()
+        
+        # Sampled frames waiting for the next batched forward pass
+        buffer = []
+        buffer_frame_nums = []
+        
+        # On CUDA, batch N+1 is copied to the device while batch N is inferred
+        uploader = None
+        if self.model_manager.get_device() == "cuda":
+            letterbox = LetterBox((640, 640), auto=False)
+            uploader = PinnedFrameUploader(slots=3, preprocess=lambda frame: letterbox(image=frame))
+        pending = None
+        
+        def infer_pending():
+            frame_nums, orig_shapes, staged = pending
+            batch_detections = self.detect_staged_batch(
+                staged, orig_shapes, model_name, conf, class_filter
+            )
+            write_q.put((frame_nums, batch_detections))
+        
+        def flush():
+            nonlocal pending
+            if uploader is None:
+                batch_detections = self.detect_objects_batch(buffer, model_name, conf, class_filter)
+                write_q.put((list(buffer_frame_nums), batch_detections))
+            else:
+                staged = uploader.upload(buffer)
+                if pending is not None:
+                    infer_pending()
+                pending = (list(buffer_frame_nums), [frame.shape[:2] for frame in buffer], staged)
+            buffer.clear()
+            buffer_frame_nums.clear()
+        
+        eof = False
+        try:
+            while True:
+                item = read_q.get()
+                if item is None:
+                    eof = True
+                    break
+                frame_num, frame = item
+                buffer.append(frame)
+                buffer_frame_nums.append(frame_num)
+                if len(buffer) == batch_size:
+                    flush()
             
-            frame_num += 1
+            if buffer:
+                flush()
+            if pending is not None:
+                infer_pending()
+        finally:
+            if not eof:
+                # Unblock the reader so it can release the capture
+                stop.set()
+                while read_q.get() is not None:
+                    pass
+            write_q.put(None)
+            reader_thread.join()
+            collector_thread.join()
         
-        cap.release()
         return frame_detections
     
     def draw_annotations(self, image: np.ndarray, detections: List[Dict], 
                         color: Tuple[int, int, int] = (0, 255, 0), 
-                        thickness: int = 2) -> np.ndarray:
-        """Draw bounding boxes on image"""
-        img_copy = image.copy()
+                        thickness: int = 2, inplace: bool = False) -> np.ndarray:
+        """
+        Draw bounding boxes on image
+        
+        Args:
+            inplace: Draw directly on `image` instead of a copy; use when the
+                caller owns a disposable frame
+        """
+        img = image if inplace else image.copy()
         
         for det in detections:
             bbox = det['bbox']
             x1, y1, x2, y2 = map(int, bbox)
             
             # Draw rectangle
-            cv2.rectangle(img_copy, (x1, y1), (x2, y2), color, thickness)
+            cv2.rectangle(img, (x1, y1), (x2, y2), color, thickness)
             
             # Draw label
             label = f"{det['class']} {det['confidence']:.2f}"
-            cv2.putText(img_copy, label, (x1, y1 - 10), 
+            cv2.putText(img, label, (x1, y1 - 10), 
                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, thickness)
         
-        return img_copy
+        return img
@@ -1,17 +1,28 @@
 """Export annotations to multiple formats"""
+import io
 import json
 import csv
+import os
+from concurrent.futures import ThreadPoolExecutor
+from itertools import repeat
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Iterator, Tuple
 import zipfile
+import numpy as np
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
 
 
 class Exporter:
     """Export annotations in multiple formats"""
     
     def __init__(self, export_dir: str = "data/exports"):
+        # Only the export_* methods write here; the iter_* generators are
+        # stateless, so one shared instance serves every request
         self.export_dir = Path(export_dir)
-        self.export_dir.mkdir(parents=True, exist_ok=True)
     
     def export_yolo(self, annotations: Dict[str, List[Dict]], 
                     image_sizes: Dict[str, tuple], class_names: List[str]) -> str:
@@ -26,81 +37,109 @@ class Exporter:
         Returns:
             Path to exported zip file
         """
-        yolo_dir = self.export_dir / "yolo"
-        yolo_dir.mkdir(exist_ok=True)
+        self._write_members(self.iter_yolo(annotations, image_sizes, class_names))
+        
+        # Zip the directory
+        zip_path = self.export_dir / "yolo_annotations.zip"
+        self._zip_directory(self.export_dir / "yolo", zip_path)
+        return str(zip_path)
+    
+    def iter_yolo(self, annotations: Dict[str, List[Dict]], image_sizes: Dict[str, tuple],
+                  class_names: List[str]) -> Iterator[Tuple[str, bytes]]:
+        """
+        Generate the YOLO export in memory
         
+        Yields:
+            (arcname, contents) for each label file under yolo/, then yolo/classes.txt
+        """
         # Create class mapping
         class_to_id = {name: idx for idx, name in enumerate(class_names)}
         
+        # Formatting holds the GIL, so it runs lazily here; export_yolo writes
+        # the files concurrently in _write_members
         for filename, dets in annotations.items():
-            txt_path = yolo_dir / f"{Path(filename).stem}.txt"
-            width, height = image_sizes[filename]
-            
-            with open(txt_path, 'w') as f:
-                for det in dets:
-                    # Convert to YOLO format: class_id x_center y_center width height (normalized)
-                    x1, y1, x2, y2 = det['bbox']
-                    x_center = ((x1 + x2) / 2) / width
-                    y_center = ((y1 + y2) / 2) / height
-                    w = (x2 - x1) / width
-                    h = (y2 - y1) / height
-                    
-                    class_id = class_to_id.get(det['class'], 0)
-                    f.write(f"{class_id} {x_center:.6f} {y_center:.6f} {w:.6f} {h:.6f}\n")
-        
-        # Create classes.txt
-        with open(yolo_dir / "classes.txt", 'w') as f:
-            for name in class_names:
-                f.write(f"{name}\n")
+            data = self._yolo_labels(dets, image_sizes[filename], class_to_id)
+            yield f"yolo/{Path(filename).stem}.txt", data
         
-        # Zip the directory
-        zip_path = self.export_dir / "yolo_annotations.zip"
-        self._zip_directory(yolo_dir, zip_path)
-        return str(zip_path)
+        yield "yolo/classes.txt", "".join(f"{name}\n" for name in class_names).encode()
+    
+    @staticmethod
+    def _yolo_labels(dets: List[Dict], image_size: tuple, class_to_id: Dict[str, int]) -> bytes:
+        """Format the YOLO label file for a single image"""
+        width, height = image_size
+        
+        if not dets:
+            return b""
+        
+        # Convert to YOLO format: class_id x_center y_center width height (normalized)
+        bboxes = np.array([det['bbox'] for det in dets], dtype=np.float64).reshape(-1, 4)
+        labels = np.empty((len(dets), 5), dtype=np.float64)
+        labels[:, 0] = [class_to_id.get(det['class'], 0) for det in dets]
+        labels[:, 1] = (bboxes[:, 0] + bboxes[:, 2]) / (2 * width)
+        labels[:, 2] = (bboxes[:, 1] + bboxes[:, 3]) / (2 * height)
+        labels[:, 3] = (bboxes[:, 2] - bboxes[:, 0]) / width
+        labels[:, 4] = (bboxes[:, 3] - bboxes[:, 1]) / height
+        
+        buf = io.BytesIO()
+        np.savetxt(buf, labels, fmt=['%d', '%.6f', '%.6f', '%.6f', '%.6f'])
+        return buf.getvalue()
     
     def export_csv(self, annotations: Dict[str, List[Dict]]) -> str:
         """Export to CSV format with polygon support"""
-        csv_path = self.export_dir / "annotations.csv"
+        self._write_members(self.iter_csv(annotations))
+        return str(self.export_dir / "annotations.csv")
+    
+    def iter_csv(self, annotations: Dict[str, List[Dict]]) -> Iterator[Tuple[str, bytes]]:
+        """Generate the CSV export in memory as a single annotations.csv member"""
+        rows = []
+        for filename, dets in annotations.items():
+            for det in dets:
+                x1, y1, x2, y2 = det['bbox']
+                shape = det.get('shape', 'rect')
+                polygon_str = ''
+                
+                if shape == 'polygon' and 'polygon_points' in det:
+                    # Format: "x1,y1;x2,y2;x3,y3"
+                    polygon_str = ';'.join([f"{p[0]:.2f},{p[1]:.2f}" for p in det['polygon_points']])
+                
+                rows.append((
+                    filename, det['class'], det['confidence'], shape,
+                    x1, y1, x2, y2, polygon_str
+                ))
         
-        with open(csv_path, 'w', newline='') as f:
-            writer = csv.writer(f)
-            writer.writerow(['filename', 'class', 'confidence', 'shape', 'x1', 'y1', 'x2', 'y2', 'polygon_points'])
-            
-            for filename, dets in annotations.items():
-                for det in dets:
-                    x1, y1, x2, y2 = det['bbox']
-                    shape = det.get('shape', 'rect')
-                    polygon_str = ''
-                    
-                    if shape == 'polygon' and 'polygon_points' in det:
-                        # Format: "x1,y1;x2,y2;x3,y3"
-                        polygon_str = ';'.join([f"{p[0]:.2f},{p[1]:.2f}" for p in det['polygon_points']])
-                    
-                    writer.writerow([
-                        filename, det['class'], det['confidence'], shape,
-                        x1, y1, x2, y2, polygon_str
-                    ])
-        
-        return str(csv_path)
+        f = io.StringIO(newline='')
+        writer = csv.writer(f)
+        writer.writerow(['filename', 'class', 'confidence', 'shape', 'x1', 'y1', 'x2', 'y2', 'polygon_points'])
+        writer.writerows(rows)
+        
+        yield "annotations.csv", f.getvalue().encode()
     
     def export_json(self, annotations: Dict[str, List[Dict]], 
-                   metadata: Dict = None) -> str:
+                   metadata: Dict = None, pretty: bool = True) -> str:
         """Export to JSON format"""
-        json_path = self.export_dir / "annotations.json"
-        
+        self._write_members(self.iter_json(annotations, metadata, pretty))
+        return str(self.export_dir / "annotations.json")
+    
+    def iter_json(self, annotations: Dict[str, List[Dict]], metadata: Dict = None,
+                  pretty: bool = True) -> Iterator[Tuple[str, bytes]]:
+        """Generate the JSON export in memory as a single annotations.json member"""
         export_data = {
             'annotations': annotations,
             'metadata': metadata or {}
         }
         
-        with open(json_path, 'w') as f:
-            json.dump(export_data, f, indent=2)
-        
-        return str(json_path)
+        yield "annotations.json", self._json_bytes(export_data, pretty)
     
     def export_coco(self, annotations: Dict[str, List[Dict]], 
-                   image_sizes: Dict[str, tuple], class_names: List[str]) -> str:
+                   image_sizes: Dict[str, tuple], class_names: List[str],
+                   pretty: bool = True) -> str:
         """Export to COCO format"""
+        self._write_members(self.iter_coco(annotations, image_sizes, class_names, pretty))
+        return str(self.export_dir / "coco_annotations.json")
+    
+    def iter_coco(self, annotations: Dict[str, List[Dict]], image_sizes: Dict[str, tuple],
+                  class_names: List[str], pretty: bool = True) -> Iterator[Tuple[str, bytes]]:
+        """Generate the COCO export in memory as a single coco_annotations.json member"""
         coco_data = {
             'images': [],
             'annotations': [],
@@ -117,8 +156,14 @@ class Exporter:
                 'supercategory': 'object'
             })
         
+        # Preallocate annotations and fill by index
+        total_anns = sum(len(dets) for dets in annotations.values())
+        coco_annotations = [None] * total_anns
+        coco_data['annotations'] = coco_annotations
+        category_id_get = class_to_id.get
+        
         # Create images and annotations
-        annotation_id = 1
+        idx = 0
         for img_id, (filename, dets) in enumerate(annotations.items(), 1):
             width, height = image_sizes[filename]
             
@@ -129,14 +174,25 @@ class Exporter:
                 'height': height
             })
             
-            for det in dets:
-                x1, y1, x2, y2 = det['bbox']
+            if not dets:
+                continue
+            
+            # COCO uses [x, y, width, height]
+            bboxes = np.array([det['bbox'] for det in dets], dtype=np.float64).reshape(-1, 4)
+            xywh = bboxes.copy()
+            xywh[:, 2:] -= bboxes[:, :2]
+            areas = xywh[:, 2] * xywh[:, 3]
+            # Bounding box as polygon: x1,y1, x2,y1, x2,y2, x1,y2
+            box_polygons = bboxes[:, [0, 1, 2, 1, 2, 3, 0, 3]]
+            
+            for det, box_polygon, bbox, area in zip(dets, box_polygons.tolist(),
+                                                    xywh.tolist(), areas.tolist()):
                 annotation = {
-                    'id': annotation_id,
+                    'id': idx + 1,
                     'image_id': img_id,
-                    'category_id': class_to_id.get(det['class'], 1),
-                    'bbox': [x1, y1, x2 - x1, y2 - y1],  # COCO uses [x, y, width, height]
-                    'area': (x2 - x1) * (y2 - y1),
+                    'category_id': category_id_get(det['class'], 1),
+                    'bbox': bbox,
+                    'area': area,
                     'iscrowd': 0
                 }
                 
@@ -148,24 +204,76 @@ class Exporter:
                         flat_points.extend([p[0], p[1]])
                     annotation['segmentation'] = [flat_points]
                 else:
-                    # Bounding box as polygon
-                    annotation['segmentation'] = [[
-                        x1, y1, x2, y1, x2, y2, x1, y2
-                    ]]
+                    annotation['segmentation'] = [box_polygon]
                 
-                coco_data['annotations'].append(annotation)
-                annotation_id += 1
+                coco_annotations[idx] = annotation
+                idx += 1
+        
+        yield "coco_annotations.json", self._json_bytes(coco_data, pretty)
+    
+    def _write_members(self, members: Iterator[Tuple[str, bytes]]):
+        """Write generated (arcname, contents) members under export_dir"""
+        # Files are independent, so write them concurrently while later
+        # members are still being generated
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+            list(executor.map(self._write_member, members, repeat(self.export_dir)))
+    
+    @staticmethod
+    def _write_member(member: Tuple[str, bytes], export_dir: Path):
+        arcname, data = member
+        path = export_dir / arcname
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+    
+    @staticmethod
+    def _json_bytes(data: Dict, pretty: bool = True) -> bytes:
+        """Serialize to JSON with orjson when available, stdlib json otherwise"""
+        if orjson is not None:
+            option = orjson.OPT_SERIALIZE_NUMPY
+            if pretty:
+                option |= orjson.OPT_INDENT_2
+            return orjson.dumps(data, option=option)
+        return json.dumps(data, indent=2 if pretty else None).encode()
+    
+    @staticmethod
+    def write_zip(members: Iterator[Tuple[str, bytes]], compress: bool = True) -> bytes:
+        """
+        Build a ZIP archive in memory from (arcname, contents) members
         
-        coco_path = self.export_dir / "coco_annotations.json"
-        with open(coco_path, 'w') as f:
-            json.dump(coco_data, f, indent=2)
+        Args:
+            compress: Deflate at the fastest level; False stores entries uncompressed
         
-        return str(coco_path)
+        Returns:
+            The archive bytes
+        """
+        buf = io.BytesIO()
+        if compress:
+            zipf = zipfile.ZipFile(buf, 'w', zipfile.ZIP_DEFLATED, compresslevel=1)
+        else:
+            zipf = zipfile.ZipFile(buf, 'w', zipfile.ZIP_STORED)
+        with zipf:
+            for arcname, data in members:
+                zipf.writestr(arcname, data)
+        return buf.getvalue()
     
     @staticmethod
-    def _zip_directory(directory: Path, zip_path: Path):
-        """Zip a directory"""
-        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            for file in directory.rglob('*'):
-                if file.is_file():
-                    zipf.write(file, file.relative_to(directory))
+    def _zip_directory(directory: Path, zip_path: Path, compress: bool = True):
+        """
+        Zip a directory
+        
+        Args:
+            compress: Deflate at the fastest level; False stores entries uncompressed
+        """
+        files = [file for file in directory.rglob('*') if file.is_file()]
+        
+        # Read members concurrently; zipfile itself deflates serially
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+            contents = executor.map(Path.read_bytes, files)
+            
+            if compress:
+                zipf = zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED, compresslevel=1)
+            else:
+                zipf = zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_STORED)
+            with zipf:
+                for file, data in zip(files, contents):
+                    zipf.writestr(file.relative_to(directory).as_posix(), data)
@@ -0,0 +1,82 @@
+"""Pinned-memory staging of host frame batches onto the GPU"""
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+import torch
+
+
+class PinnedFrameUploader:
+    """
+    Copy host frame batches to the GPU through pinned buffers on a side stream
+
+    A ring of pinned host / device buffer pairs is reused, so one batch is
+    copied while the previous one is inferred. Each frame goes through
+    preprocess (identity by default) on its way into pinned memory, which
+    may return a non-contiguous view such as a channel flip. Buffers are
+    sized by the first batch (pinned blocks come from torch's caching host
+    allocator, so per-request instances are cheap after the first) and
+    rebuilt if frames get larger.
+
+    The returned device view is overwritten once its slot comes round
+    again, so keep fewer than `slots` batches in flight.
+    """
+
+    def __init__(self, device="cuda", slots: int = 2,
+                 preprocess: Optional[Callable[[np.ndarray], np.ndarray]] = None):
+        self.device = torch.device(device)
+        self.stream = torch.cuda.Stream(self.device)
+        self.preprocess = preprocess
+        self._slot_count = slots
+        self._slots: List[list] = []
+        self._next = 0
+
+    def _ensure_slots(self, count: int, frame_shape: Tuple[int, ...]):
+        if self._slots:
+            host = self._slots[0][0]
+            if host.shape[0] >= count and tuple(host.shape[1:]) == frame_shape:
+                return
+        # A resize must not free buffers that a copy is still reading
+        for _, _, copied in self._slots:
+            if copied is not None:
+                copied.synchronize()
+        shape = (count, *frame_shape)
+        self._slots = [
+            [torch.empty(shape, dtype=torch.uint8, pin_memory=True),
+             torch.empty(shape, dtype=torch.uint8, device=self.device),
+             None]
+            for _ in range(self._slot_count)
+        ]
+        self._next = 0
+
+    def upload(self, frames: List[np.ndarray]) -> Tuple[torch.Tensor, torch.cuda.Event]:
+        """
+        Stage uint8 HWC frames and start their host->device copy
+
+        Blocking; call it from a worker thread. The frames may be reused once
+        this returns.
+
+        Returns:
+            (N, H, W, C) uint8 device view of the preprocessed frames and the
+            event that marks the copy done; wait on it before reading the view
+        """
+        if self.preprocess is not None:
+            frames = [self.preprocess(frame) for frame in frames]
+        count = len(frames)
+        self._ensure_slots(count, frames[0].shape)
+        slot = self._slots[self._next]
+        self._next = (self._next + 1) % len(self._slots)
+        host, device_buf, copied = slot
+
+        # Don't overwrite a pinned buffer whose previous copy is still in flight
+        if copied is not None:
+            copied.synchronize()
+        host_np = host.numpy()
+        for i, frame in enumerate(frames):
+            host_np[i] = frame
+
+        with torch.cuda.stream(self.stream):
+            device_buf[:count].copy_(host[:count], non_blocking=True)
+            copied = torch.cuda.Event()
+            copied.record(self.stream)
+        slot[2] = copied
+        return device_buf[:count], copied
@@ -1,8 +1,101 @@
 """YOLO Model Manager - Handles model loading and inference"""
 from ultralytics import YOLO
+from contextlib import contextmanager
+from functools import lru_cache
+from importlib.util import find_spec
 from pathlib import Path
 from typing import Dict, List, Optional
-import streamlit as st
+import threading
+import torch
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+
+# Largest batch a dynamic TensorRT engine is built for
+ENGINE_MAX_BATCH = 16
+
+# CUDA engines need TensorRT; without it CUDA runs the fused PyTorch weights,
+# which MultiModelManager replays as CUDA graphs
+TENSORRT_AVAILABLE = find_spec("tensorrt") is not None
+
+# INT8 CPU inference needs OpenVINO; calibration uses Ultralytics' small COCO subset
+INT8_AVAILABLE = find_spec("openvino") is not None
+INT8_CALIBRATION_DATA = "coco8.yaml"
+
+# lru_cache does not serialize concurrent misses, so exports of the same
+# model take a per-model lock; the second caller then finds the export on disk
+_export_locks: Dict[str, threading.Lock] = {}
+_export_locks_guard = threading.Lock()
+
+
+@contextmanager
+def _export_lock(model_path: str):
+    """
+    Hold the export lock for a model across threads and processes
+    
+    Threads share a threading.Lock; processes (such as auto-labeling
+    workers) also take an flock on a lock file next to the weights.
+    """
+    with _export_locks_guard:
+        lock = _export_locks.setdefault(model_path, threading.Lock())
+    with lock, open(Path(model_path).with_suffix(".export.lock"), "a") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        yield
+
+
+@lru_cache(maxsize=2)
+def load_yolo(model_path: str, device: str, imgsz: int = 640, int8: bool = False,
+              export: bool = True) -> YOLO:
+    """
+    Load YOLO weights, keeping at most two models resident across managers
+    
+    The weights are fused and exported once, next to the .pt: on CUDA to a
+    half-precision TensorRT engine (when TensorRT is installed), on CPU to a
+    dynamic-batch ONNX model that Ultralytics runs through onnxruntime. Later
+    loads reuse the export.
+    
+    Args:
+        int8: On CPU, export an INT8-calibrated OpenVINO model instead of ONNX
+            (ignored on CUDA or without OpenVINO)
+        export: False keeps the fused PyTorch weights, whose thread count
+            follows torch.set_num_threads
+    """
+    export_path = None
+    if not export or (device == "cuda" and not TENSORRT_AVAILABLE):
+        export_format, export_kwargs = None, {}
+    elif device == "cuda":
+        export_format, export_kwargs = "engine", {"half": True, "batch": ENGINE_MAX_BATCH}
+    elif int8 and INT8_AVAILABLE:
+        export_format, export_kwargs = "openvino", {"int8": True, "data": INT8_CALIBRATION_DATA}
+        # Ultralytics writes OpenVINO models to a <stem>_int8_openvino_model/ directory
+        export_path = Path(model_path).with_name(f"{Path(model_path).stem}_int8_openvino_model")
+    elif find_spec("onnxruntime") is not None:
+        export_format, export_kwargs = "onnx", {"simplify": True}
+    else:
+        export_format, export_kwargs = None, {}
+    
+    with _export_lock(model_path):
+        if export_format is not None:
+            export_path = export_path or Path(model_path).with_suffix(f".{export_format}")
+            if export_path.exists():
+                return YOLO(str(export_path), task="detect")
+        
+        # Load model (will download if not exists)
+        model = YOLO(model_path)
+        model.fuse()
+        if export_format is not None:
+            try:
+                export_path = model.export(format=export_format, imgsz=imgsz, dynamic=True,
+                                           **export_kwargs)
+                model = YOLO(str(export_path), task="detect")
+            except Exception as e:
+                # Exporter missing or model not exportable; keep the fused weights
+                print(f"{export_format} export failed for {model_path}: {e}")
+        return model
 
 
 class ModelManager:
@@ -16,24 +109,29 @@ class ModelManager:
         "YOLO-World-v2s (Zero-shot)": "yolov8s-worldv2.pt",
     }
     
-    def __init__(self, models_dir: str = "data/models"):
+    def __init__(self, models_dir: str = "data/models", export: bool = True):
         self.models_dir = Path(models_dir)
+        # False keeps the PyTorch weights instead of load_yolo's exported runtimes
+        self.export = export
         self.models_dir.mkdir(parents=True, exist_ok=True)
-        self._cache = {}
     
-    @st.cache_resource
-    def load_model(_self, model_name: str) -> YOLO:
-        """Load YOLO model with caching"""
-        if model_name in _self._cache:
-            return _self._cache[model_name]
-        
-        model_path = _self.AVAILABLE_MODELS.get(model_name)
+    @staticmethod
+    def get_device() -> str:
+        """Inference device used for loaded models"""
+        return "cuda" if torch.cuda.is_available() else "cpu"
+    
+    def load_model(self, model_name: str, imgsz: int = 640) -> YOLO:
+        """Load YOLO model through the shared LRU cache"""
+        model_path = self.AVAILABLE_MODELS.get(model_name)
         if not model_path:
             raise ValueError(f"Model {model_name} not found")
         
-        # Load model (will download if not exists)
-        model = YOLO(model_path)
-        _self._cache[model_name] = model
+        device = self.get_device()
+        misses = load_yolo.cache_info().misses
+        model = load_yolo(model_path, device, imgsz, export=self.export)
+        if device == "cuda" and load_yolo.cache_info().misses > misses:
+            # A new load may have evicted a model; return its blocks to the driver
+            torch.cuda.empty_cache()
         return model
     
     def get_available_models(self) -> List[str]:
@@ -44,5 +142,7 @@ class ModelManager:
                 classes: Optional[List[int]] = None, **kwargs):
         """Run prediction with specified model"""
         model = self.load_model(model_name)
+        if self.get_device() == "cuda":
+            kwargs.setdefault("half", True)
         results = model.predict(source, conf=conf, classes=classes, **kwargs)
         return results
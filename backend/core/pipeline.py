@@ -0,0 +1,203 @@
+"""Async decode -> inference -> postprocess pipeline for detection requests"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, List, Optional
+
+
+@dataclass
+class _Job:
+    value: Any
+    params: Any
+    future: asyncio.Future = field(repr=False)
+
+
+class PipelineRunner:
+    """
+    Three-stage pipeline connected by asyncio queues
+
+    Decode and postprocess run on thread pools; inference runs on a single
+    dedicated thread that owns the models. Several requests can therefore be
+    in flight at once: one image is inferred while others are decoded or
+    have their responses assembled.
+
+    Each stage function is called as fn(value, params) and its return value
+    is handed to the next stage; the postprocess result resolves submit().
+
+    With batch_infer_fn and max_batch > 1, the inference stage micro-batches:
+    after taking a job it gathers more for up to batch_window_ms (or until
+    max_batch), and jobs with equal params share one batch_infer_fn call.
+    Concurrent submit() callers then cost one forward pass instead of one each.
+    """
+
+    def __init__(self, decode_fn: Callable, infer_fn: Callable, postprocess_fn: Callable,
+                 batch_infer_fn: Optional[Callable] = None,
+                 decode_workers: int = 4, postprocess_workers: int = 2, maxsize: int = 64,
+                 max_batch: int = 1, batch_window_ms: float = 0.0):
+        self.decode_fn = decode_fn
+        self.infer_fn = infer_fn
+        self.postprocess_fn = postprocess_fn
+        self.batch_infer_fn = batch_infer_fn
+        self.decode_workers = decode_workers
+        self.postprocess_workers = postprocess_workers
+        self.maxsize = maxsize
+        self.max_batch = max_batch
+        self.batch_window = batch_window_ms / 1000
+
+        self._decode_pool = ThreadPoolExecutor(decode_workers, thread_name_prefix="autood-decode")
+        self._infer_pool = ThreadPoolExecutor(1, thread_name_prefix="autood-infer")
+        self._post_pool = ThreadPoolExecutor(postprocess_workers, thread_name_prefix="autood-post")
+        self._tasks: List[asyncio.Task] = []
+        self._decode_q: Optional[asyncio.Queue] = None
+
+    async def start(self):
+        """Spawn the stage workers on the running event loop"""
+        if self._tasks:
+            return
+
+        self._decode_q = asyncio.Queue(self.maxsize)
+        infer_q = asyncio.Queue(self.maxsize)
+        post_q = asyncio.Queue(self.maxsize)
+
+        stages = (
+            [(self._decode_q, self._decode_pool, self.decode_fn, infer_q)] * self.decode_workers
+            + [(post_q, self._post_pool, self.postprocess_fn, None)] * self.postprocess_workers
+        )
+        self._tasks = [asyncio.create_task(self._run_stage(*stage)) for stage in stages]
+        if self.batch_infer_fn is not None and self.max_batch > 1:
+            self._tasks.append(asyncio.create_task(self._run_batched_infer_stage(infer_q, post_q)))
+        else:
+            self._tasks.append(asyncio.create_task(
+                self._run_stage(infer_q, self._infer_pool, self.infer_fn, post_q)
+            ))
+
+    async def stop(self):
+        """Cancel the stage workers and release the thread pools"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        for pool in (self._decode_pool, self._infer_pool, self._post_pool):
+            pool.shutdown(wait=False)
+
+    async def submit(self, value: Any, params: Any = None) -> Any:
+        """Run one item through all three stages and return the postprocess result"""
+        if not self._tasks:
+            await self.start()
+
+        future = asyncio.get_running_loop().create_future()
+        await self._decode_q.put(_Job(value, params, future))
+        return await future
+
+    async def submit_batch(self, values: List[Any], params: Any = None) -> List[Any]:
+        """
+        Decode items concurrently and infer them with one batch_infer_fn call
+
+        batch_infer_fn(decoded_values, params) must return one output per input.
+
+        Returns:
+            Postprocess results in input order; an item whose decode or
+            postprocess failed holds the exception instead
+        """
+        if self.batch_infer_fn is None:
+            raise RuntimeError("PipelineRunner has no batch_infer_fn")
+
+        loop = asyncio.get_running_loop()
+        outputs: List[Any] = list(await asyncio.gather(
+            *(loop.run_in_executor(self._decode_pool, self.decode_fn, value, params)
+              for value in values),
+            return_exceptions=True
+        ))
+        decoded = [i for i, output in enumerate(outputs) if not isinstance(output, BaseException)]
+        if not decoded:
+            return outputs
+
+        try:
+            inferred = await loop.run_in_executor(
+                self._infer_pool, self.batch_infer_fn, [outputs[i] for i in decoded], params
+            )
+        except Exception as e:
+            for i in decoded:
+                outputs[i] = e
+            return outputs
+
+        results = await asyncio.gather(
+            *(loop.run_in_executor(self._post_pool, self.postprocess_fn, value, params)
+              for value in inferred),
+            return_exceptions=True
+        )
+        for i, result in zip(decoded, results):
+            outputs[i] = result
+        return outputs
+
+    async def run_inference(self, fn: Callable, *args) -> Any:
+        """Run fn on the inference thread, serialized with pipeline inference"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._infer_pool, fn, *args)
+
+    async def _run_batched_infer_stage(self, in_q: asyncio.Queue, out_q: asyncio.Queue):
+        loop = asyncio.get_running_loop()
+        while True:
+            jobs = [await in_q.get()]
+            deadline = loop.time() + self.batch_window
+            while len(jobs) < self.max_batch:
+                try:
+                    jobs.append(in_q.get_nowait())
+                    continue
+                except asyncio.QueueEmpty:
+                    pass
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    jobs.append(await asyncio.wait_for(in_q.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                # Only jobs with equal params (model, thresholds) can share a forward pass
+                groups = {}
+                for job in jobs:
+                    if not job.future.done():
+                        groups.setdefault(job.params, []).append(job)
+
+                for params, group in groups.items():
+                    try:
+                        outputs = await loop.run_in_executor(
+                            self._infer_pool, self.batch_infer_fn, [job.value for job in group], params
+                        )
+                    except Exception as e:
+                        for job in group:
+                            if not job.future.done():
+                                job.future.set_exception(e)
+                        continue
+                    for job, output in zip(group, outputs):
+                        job.value = output
+                        await out_q.put(job)
+            finally:
+                for _ in jobs:
+                    in_q.task_done()
+
+    @staticmethod
+    async def _run_stage(in_q: asyncio.Queue, pool: ThreadPoolExecutor, fn: Callable,
+                         out_q: Optional[asyncio.Queue]):
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await in_q.get()
+            try:
+                if job.future.done():
+                    # Caller went away (e.g. request cancelled)
+                    continue
+                job.value = await loop.run_in_executor(pool, fn, job.value, job.params)
+            except Exception as e:
+                if not job.future.done():
+                    job.future.set_exception(e)
+                continue
+            finally:
+                in_q.task_done()
+
+            if out_q is None:
+                if not job.future.done():
+                    job.future.set_result(job.value)
+            else:
+                await out_q.put(job)
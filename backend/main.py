@@ -1,24 +1,43 @@
 """FastAPI Backend for AutoOD - Multi-model object detection API"""
-from fastapi import FastAPI, UploadFile, File, HTTPException, Form, BackgroundTasks
+from fastapi import FastAPI, UploadFile, File, HTTPException, Form, BackgroundTasks, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi.responses import JSONResponse, FileResponse, ORJSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Iterable, Tuple
+from dataclasses import dataclass
+from functools import lru_cache
+from collections import OrderedDict
+from collections.abc import Sequence
+import asyncio
+import contextlib
+import copy
+import hashlib
+import math
+import queue
+import threading
 import cv2
 import numpy as np
-from PIL import Image
 import io
 import tempfile
 import json
+import orjson
 import os
-import zipfile
-import base64
+import shutil
+import uuid
 from datetime import datetime
+from itertools import chain
 from pathlib import Path
 import sys
-from ultralytics import YOLO
+from concurrent.futures import ThreadPoolExecutor
+
+# Must be set before torch initializes CUDA; several resident models otherwise
+# fragment the caching allocator
+os.environ.setdefault("PYTORCH_CUDA_ALLOC_CONF", "expandable_segments:True,garbage_collection_threshold:0.8")
+
+from ultralytics.utils.ops import non_max_suppression
 import torch
-from torchvision.transforms.functional import to_tensor
+import torch.nn.functional as F
+import torchvision.io
 from torchvision.models.detection import (
     fasterrcnn_resnet50_fpn,
     FasterRCNN_ResNet50_FPN_Weights,
@@ -31,9 +50,35 @@ from torchvision.models.detection import (
 )
 from transformers import DetrImageProcessor, DetrForObjectDetection
 from effdet import create_model
+from timm.data import IMAGENET_DEFAULT_MEAN, IMAGENET_DEFAULT_STD
+
+from core.cuda_graph import CUDAGraphRunner
+from core.frame_uploader import PinnedFrameUploader
+
+try:
+    from turbojpeg import TurboJPEG, TJPF_BGR
+except ImportError:  # pragma: no cover - optional dependency
+    TurboJPEG = None
+
+try:
+    import av
+except ImportError:  # pragma: no cover - optional dependency
+    av = None
+
+try:
+    import xxhash
+except ImportError:  # pragma: no cover - optional dependency
+    xxhash = None
 
 
 
+# Captured YOLO CUDA graphs kept resident, each with its own copy of the network
+YOLO_GRAPH_CACHE_SIZE = 4
+
+# precision="auto" only picks the INT8 CPU export when this is set; it is
+# always available on request with precision="int8"
+INT8_BY_DEFAULT = os.environ.get("AUTOOD_INT8", "0") == "1"
+
 # Import only what we need, create custom classes to avoid streamlit dependency
 class MultiModelManager:
     AVAILABLE = [
@@ -53,34 +98,170 @@ class MultiModelManager:
 
     def __init__(self):
         self._cache: Dict[str, Any] = {}
+        self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        # Set when the DETR model loads; normalization constants are built once with it
+        self._detr_processor = None
+        self._detr_mean = None
+        self._detr_std = None
+        # uint8 -> ImageNet-normalized float as one multiply-subtract: x * scale - shift
+        self._effdet_scale = None
+        self._effdet_shift = None
+        # CUDA graph runners for fixed-shape YOLO video batches, keyed by
+        # (model id, input shape), least recently used first
+        self._yolo_graphs: "OrderedDict[Tuple[str, Tuple[int, ...]], CUDAGraphRunner]" = OrderedDict()
+        # YOLO models whose capture failed; they stay on predict()
+        self._yolo_graph_failed: set = set()
+
+    def _yolo_graph(self, model_id: str, model, shape) -> Optional[CUDAGraphRunner]:
+        """
+        CUDA graph runner over a private copy of the raw YOLO network, one per input shape
+        
+        This is the CUDA path when TensorRT is not installed and load_yolo
+        returns the fused PyTorch weights; TensorRT engines are already a
+        fixed-launch runtime and get no graph.
+        """
+        if model_id in self._yolo_graph_failed or not isinstance(model.model, torch.nn.Module):
+            return None
+        key = (model_id, tuple(shape))
+        runner = self._yolo_graphs.get(key)
+        if runner is not None:
+            self._yolo_graphs.move_to_end(key)
+            return runner
+        
+        # The Detect head rebuilds its anchor/stride tensors whenever the input
+        # shape changes, which would free memory a captured graph still reads.
+        # A dedicated copy per shape never changes shape, and fusing/halving it
+        # leaves the predictor's module alone.
+        net = copy.deepcopy(model.model).fuse(verbose=False).to(self.device).half().eval()
 
-    def load_model(self, model_id: str):
+        def forward(x):
+            out = net(x)
+            # Eval-mode heads return (predictions, feature maps)
+            return out[0] if isinstance(out, (tuple, list)) else out
+
+        runner = CUDAGraphRunner(forward, max_graphs=1)
+        self._yolo_graphs[key] = runner
+        if len(self._yolo_graphs) > YOLO_GRAPH_CACHE_SIZE:
+            self._yolo_graphs.popitem(last=False)
+        return runner
+
+    def _place_model(self, model, half: bool = False):
+        """Move a torch model to the inference device, in FP16 on CUDA when `half`"""
+        model = model.to(self.device)
+        if self.device.type == "cuda":
+            if half:
+                model = model.half()
+        else:
+            model = model.to(memory_format=torch.channels_last)
+        return model
+
+    def _compile(self, model):
+        """Wrap a model with torch.compile; _forward() reverts to eager if compilation fails"""
+        if not hasattr(torch, "compile"):
+            return model
+        # reduce-overhead replays CUDA graphs, which only pays off on the GPU
+        mode = "reduce-overhead" if self.device.type == "cuda" else "default"
+        try:
+            return torch.compile(model, mode=mode, fullgraph=False)
+        except Exception as e:
+            print(f"torch.compile unavailable, using eager model: {str(e)}")
+            return model
+
+    def warmup(self, model_id: str):
+        """Run one dummy forward so weights, kernels and compiled graphs are ready"""
+        dummy = np.zeros((640, 640, 3), dtype=np.uint8)
+        self.detect(model_id, dummy)
+
+    def _forward(self, model_id: str, model, *args, **kwargs):
+        """
+        Call a cached model
+        
+        torch.compile only compiles on the first call, so that is where it
+        fails; a compiled model that raises is replaced in the cache by its
+        eager module for good, and the call is retried on it.
+        """
+        try:
+            return model(*args, **kwargs)
+        except Exception as e:
+            eager = getattr(model, "_orig_mod", None)
+            if eager is None:
+                raise
+            print(f"Compiled {model_id} failed, falling back to eager: {str(e)}")
+            _, meta, device = self._cache[model_id]
+            self._cache[model_id] = (eager, meta, device)
+            return eager(*args, **kwargs)
+
+    @staticmethod
+    def _load_checkpoint(url: str) -> Dict[str, torch.Tensor]:
+        """Download a checkpoint into the torch hub cache once, then memory-map it"""
+        path = os.path.join(torch.hub.get_dir(), "checkpoints", os.path.basename(url))
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            torch.hub.download_url_to_file(url, path)
+        return torch.load(path, map_location="cpu", mmap=True, weights_only=True)
+
+    def _autocast(self):
+        """bfloat16 autocast on CPU; CUDA models are already placed in their dtype"""
+        if self.device.type == "cpu":
+            return torch.autocast("cpu", dtype=torch.bfloat16)
+        return contextlib.nullcontext()
+
+    def _use_int8(self, precision: str) -> bool:
+        """Whether a YOLO load at this precision should use the INT8 CPU export"""
+        if self.device.type != "cpu" or not INT8_AVAILABLE:
+            return False
+        return precision == "int8" or (precision == "auto" and INT8_BY_DEFAULT)
+
+    def load_model(self, model_id: str, precision: str = "auto"):
+        """
+        Load (or fetch from cache) a model and its metadata
+        
+        Args:
+            precision: "auto", "int8" or "fp32". On CPU, YOLO runs an INT8
+                OpenVINO export for "int8" (and for "auto" when AUTOOD_INT8=1)
+                if OpenVINO is installed, and the FP32 export otherwise; other
+                backends and CUDA devices ignore it.
+        """
+        backend, name = model_id.split("/", 1)
         if model_id in self._cache:
             return self._cache[model_id]
 
-        backend, name = model_id.split("/", 1)
         if backend == "yolo":
-            model = YOLO(name)
-            self._cache[model_id] = (model, None)
-            return self._cache[model_id]
+            # TensorRT engine on CUDA, OpenVINO/onnxruntime on CPU; exported once, next to
+            # the .pt. Not kept in self._cache, so load_yolo's LRU alone bounds residency.
+            misses = load_yolo.cache_info().misses
+            model = load_yolo(name, self.device.type, int8=self._use_int8(precision))
+            if self.device.type == "cuda" and load_yolo.cache_info().misses > misses:
+                # A new load may have evicted a model; return its blocks to the driver
+                torch.cuda.empty_cache()
+            if ORT_AVAILABLE and str(getattr(model, "ckpt_path", "")).endswith(".onnx"):
+                # Run the ONNX export on our own thread-tuned session
+                model = _onnx_yolo(str(model.ckpt_path))
+            return model, None, self.device
         elif backend == "torchvision":
             if name == "fasterrcnn_resnet50_fpn":
                 weights = FasterRCNN_ResNet50_FPN_Weights.DEFAULT
-                model = fasterrcnn_resnet50_fpn(weights=weights)
+                builder = fasterrcnn_resnet50_fpn
             elif name == "maskrcnn_resnet50_fpn":
                 weights = MaskRCNN_ResNet50_FPN_Weights.DEFAULT
-                model = maskrcnn_resnet50_fpn(weights=weights)
+                builder = maskrcnn_resnet50_fpn
             elif name == "retinanet_resnet50_fpn":
                 weights = RetinaNet_ResNet50_FPN_Weights.DEFAULT
-                model = retinanet_resnet50_fpn(weights=weights)
+                builder = retinanet_resnet50_fpn
             elif name == "ssd300_vgg16":
                 weights = SSD300_VGG16_Weights.DEFAULT
-                model = ssd300_vgg16(weights=weights)
+                builder = ssd300_vgg16
             else:
                 raise ValueError("Unsupported torchvision model")
+            # Build without weights (nor the ImageNet backbone), then map the checkpoint in
+            model = builder(weights=None, weights_backbone=None,
+                            num_classes=len(weights.meta["categories"]))
+            model.load_state_dict(self._load_checkpoint(weights.url), assign=True)
             model.eval()
+            model = self._place_model(model, half=True)
+            model = self._compile(model)
             categories = weights.meta.get("categories") if hasattr(weights, "meta") else None
-            self._cache[model_id] = (model, categories)
+            self._cache[model_id] = (model, categories, self.device)
             return self._cache[model_id]
         elif backend == "transformers":
             if name == "detr_resnet50":
@@ -89,7 +270,11 @@ class MultiModelManager:
             else:
                 raise ValueError("Unsupported transformers model")
             model.eval()
-            self._cache[model_id] = (model, {"processor": processor})
+            model = self._place_model(model)
+            self._detr_processor = processor
+            self._detr_mean = torch.tensor(processor.image_mean).view(3, 1, 1)
+            self._detr_std = torch.tensor(processor.image_std).view(3, 1, 1)
+            self._cache[model_id] = (model, None, self.device)
             return self._cache[model_id]
         elif backend == "effdet":
             if name == "tf_efficientdet_d0":
@@ -97,7 +282,14 @@ class MultiModelManager:
             else:
                 raise ValueError("Unsupported effdet model")
             model.eval()
-            self._cache[model_id] = (model, None)
+            model = self._place_model(model, half=True)
+            model = self._compile(model)
+            dtype = torch.float16 if self.device.type == "cuda" else torch.float32
+            mean = torch.tensor(IMAGENET_DEFAULT_MEAN).view(1, 3, 1, 1)
+            std = torch.tensor(IMAGENET_DEFAULT_STD).view(1, 3, 1, 1)
+            self._effdet_scale = (1.0 / (255.0 * std)).to(self.device, dtype)
+            self._effdet_shift = (mean / std).to(self.device, dtype)
+            self._cache[model_id] = (model, None, self.device)
             return self._cache[model_id]
         else:
             raise ValueError("Unsupported backend")
@@ -106,160 +298,653 @@ class MultiModelManager:
         return list(self.AVAILABLE)
 
     def detect(self, model_id: str, image: np.ndarray, conf: float = 0.25,
-               class_filter: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+               class_filter: Optional[Iterable[str]] = None,
+               precision: str = "auto") -> Dict[str, Any]:
+        """
+        Detect objects in one BGR image (as decoded by OpenCV)
+
+        Returns:
+            Columnar detections: {"classes": list[str], "class_ids": (N,) int ndarray,
+            "confidences": (N,) ndarray, "bboxes": (N, 4) xyxy ndarray, "count": int}. Wrap in AsDictAdapter
+            for the per-object dict view.
+        """
+        return self.detect_batch(model_id, [image], conf=conf, class_filter=class_filter,
+                                 precision=precision)[0]
+
+    def detect_batch(self, model_id: str, images: List[np.ndarray], conf: float = 0.25,
+                     class_filter: Optional[Iterable[str]] = None,
+                     precision: str = "auto") -> List[Dict[str, Any]]:
+        """Run one forward pass over BGR images; returns per-image detections in order"""
         try:
             backend, name = model_id.split("/", 1)
             print(f"Loading model: {model_id} (backend: {backend}, name: {name})")
-            model, categories = self.load_model(model_id)
+            model, categories, device = self.load_model(model_id, precision)
             print(f"Model loaded successfully: {model_id}")
         except Exception as e:
             print(f"Error loading model {model_id}: {str(e)}")
             raise
 
+        if not images:
+            return []
+        # Per-box membership tests against a set, whichever container the caller passed
+        if class_filter:
+            class_filter = frozenset(class_filter)
+
+        # Torch backends take inputs in the dtype their weights were placed in
+        dtype = torch.float16 if device.type == "cuda" else torch.float32
+
         if backend == "yolo":
+            if len(images) > ENGINE_MAX_BATCH:
+                # TensorRT engines are built for at most ENGINE_MAX_BATCH images per run
+                return [
+                    detections
+                    for start in range(0, len(images), ENGINE_MAX_BATCH)
+                    for detections in self.detect_batch(
+                        model_id, images[start:start + ENGINE_MAX_BATCH], conf=conf,
+                        class_filter=class_filter, precision=precision
+                    )
+                ]
             try:
-                print(f"Running YOLO detection with confidence: {conf}")
-                results = model.predict(image, conf=conf, verbose=False)
-                detections: List[Dict[str, Any]] = []
-                for result in results:
-                    boxes = result.boxes
-                    if boxes is None or len(boxes) == 0:
-                        print("No boxes detected")
-                        continue
-                    for i in range(len(boxes)):
-                        try:
-                            class_id = int(boxes.cls[i])
-                            class_name = result.names[class_id]
-                            if class_filter and class_name not in class_filter:
-                                continue
-                            bbox = boxes.xyxy[i].cpu().numpy().tolist()
-                            confidence = float(boxes.conf[i])
-                            detections.append({
-                                "class": class_name,
-                                "confidence": confidence,
-                                "bbox": bbox,
-                                "shape": "rect",
-                            })
-                        except Exception as e:
-                            print(f"Error processing box {i}: {str(e)}")
-                            continue
-                print(f"YOLO detection completed - {len(detections)} objects found")
-                return detections
+                print(f"Running YOLO detection on {len(images)} image(s) with confidence: {conf}")
+                if isinstance(model, OnnxYOLO):
+                    return [self._parse_yolo_nms(det, model.names, ratio, image.shape[:2], class_filter)
+                            for (det, ratio), image in zip(model.predict(list(images), conf=conf), images)]
+                if device.type == "cuda" and all(image.shape == images[0].shape for image in images):
+                    # Letterbox on the GPU rather than in Ultralytics' per-image CPU preprocess
+                    host = images[0][None] if len(images) == 1 else np.stack(images)
+                    frames = torch.from_numpy(np.ascontiguousarray(host)).to(device)
+                    return self.detect_batch_tensor(model_id, frames.permute(0, 3, 1, 2).flip(1),
+                                                    conf=conf, class_filter=class_filter)
+                # Ultralytics expects BGR numpy input, like cv2.imread returns
+                results = model.predict(list(images), conf=conf, half=device.type == "cuda",
+                                        verbose=False)
+                batch_detections = [self._parse_yolo(result, class_filter) for result in results]
+                print(f"YOLO detection completed - {sum(d['count'] for d in batch_detections)} objects found")
+                return batch_detections
             except Exception as e:
                 print(f"YOLO detection error: {str(e)}")
                 raise
 
         if backend == "torchvision":
-            tensor = to_tensor(image)
-            with torch.no_grad():
-                outputs = model([tensor])[0]
-            boxes = outputs.get("boxes")
-            scores = outputs.get("scores")
-            labels = outputs.get("labels")
-            detections: List[Dict[str, Any]] = []
-            for i in range(boxes.shape[0]):
-                score = float(scores[i].item())
-                if score < conf:
-                    continue
-                label_idx = int(labels[i].item())
-                class_name = str(label_idx)
-                if categories and 0 <= label_idx < len(categories):
-                    class_name = categories[label_idx]
-                if class_filter and class_name not in class_filter:
-                    continue
-                bbox = boxes[i].cpu().numpy().tolist()
-                detections.append({
-                    "class": class_name,
-                    "confidence": score,
-                    "bbox": bbox,
-                    "shape": "rect",
-                })
-            return detections
+            # Detection models take a list of variable-size tensors and batch internally
+            # Upload the BGR array as-is (ascontiguousarray is a no-op for decoded
+            # frames); the channel flip runs on the device, so the host never copies
+            tensors = [
+                torch.from_numpy(np.ascontiguousarray(image)).to(device, non_blocking=True)
+                .permute(2, 0, 1).flip(0).to(dtype).div_(255.)
+                for image in images
+            ]
+            with torch.no_grad(), self._autocast():
+                outputs = self._forward(model_id, model, tensors)
+            return [self._parse_torchvision(output, categories, conf, class_filter) for output in outputs]
 
         if backend == "transformers":
-            meta = categories or {}
-            processor = meta.get("processor")
-            if processor is None:
+            if self._detr_processor is None:
                 raise ValueError("DETR processor missing")
-            pil = Image.fromarray(image)
-            inputs = processor(images=pil, return_tensors="pt")
-            with torch.no_grad():
-                outputs = model(**inputs)
-            target_sizes = torch.tensor([pil.size[::-1]])
-            results = processor.post_process_object_detection(outputs, target_sizes=target_sizes)[0]
-            detections: List[Dict[str, Any]] = []
-            for score, label, box in zip(results["scores"], results["labels"], results["boxes"]):
-                s = float(score.item())
-                if s < conf:
-                    continue
-                cls = int(label.item())
-                class_name = str(cls)
-                if class_filter and class_name not in class_filter:
-                    continue
-                bbox = box.tolist()
-                detections.append({
-                    "class": class_name,
-                    "confidence": s,
-                    "bbox": bbox,
-                    "shape": "rect",
-                })
-            return detections
+            pixel_values, pixel_mask = self._detr_inputs(images)
+            pixel_values = pixel_values.to(device, non_blocking=True)
+            pixel_mask = pixel_mask.to(device, non_blocking=True)
+            with torch.no_grad(), self._autocast():
+                outputs = model(pixel_values=pixel_values, pixel_mask=pixel_mask)
+                boxes, scores, labels = self._decode_detr(outputs)
+            return [
+                self._parse_detr(boxes_i, scores_i, labels_i, image.shape, conf, class_filter)
+                for boxes_i, scores_i, labels_i, image in zip(boxes, scores, labels, images)
+            ]
 
         if backend == "effdet":
-            pil = Image.fromarray(image).convert("RGB").resize((512, 512))
-            tensor = to_tensor(pil).unsqueeze(0)
-            with torch.no_grad():
-                pred = model(tensor)
-            # effdet returns list of dicts per batch
-            boxes = scores = labels = None
-            pred0 = pred
-            if isinstance(pred, (list, tuple)):
-                # Batch list
-                pred0 = pred[0]
-                if isinstance(pred0, (list, tuple)) and len(pred0) == 3:
-                    boxes, scores, labels = pred0
-                elif hasattr(pred0, "get"):
-                    boxes = pred0.get("boxes")
-                    scores = pred0.get("scores")
-                    labels = pred0.get("labels") or pred0.get("classes")
-                elif isinstance(pred0, torch.Tensor):
-                    # Nx6: x1,y1,x2,y2,score,label
-                    arr = pred0
-                    if arr.ndim == 2 and arr.shape[1] >= 6:
-                        boxes = arr[:, 0:4]
-                        scores = arr[:, 4]
-                        labels = arr[:, 5]
-            elif hasattr(pred0, "get"):
-                boxes = pred0.get("boxes")
-                scores = pred0.get("scores")
-                labels = pred0.get("labels") or pred0.get("classes")
-            elif isinstance(pred0, torch.Tensor):
-                arr = pred0
-                if arr.ndim == 2 and arr.shape[1] >= 6:
-                    boxes = arr[:, 0:4]
-                    scores = arr[:, 4]
-                    labels = arr[:, 5]
-            detections: List[Dict[str, Any]] = []
-            if boxes is not None and scores is not None and labels is not None:
-                for bbox, score, label in zip(boxes, scores, labels):
-                    s = float(score)
-                    if s < conf:
-                        continue
-                    class_name = str(int(label))
-                    if class_filter and class_name not in class_filter:
-                        continue
-                    detections.append({
-                        "class": class_name,
-                        "confidence": s,
-                        "bbox": bbox.tolist() if hasattr(bbox, "tolist") else list(bbox),
-                        "shape": "rect",
-                    })
-            return detections
+            # Resize straight into one uint8 NHWC buffer; it is the only host allocation
+            resized = np.empty((len(images), 512, 512, 3), dtype=np.uint8)
+            for i, image in enumerate(images):
+                cv2.resize(image, (512, 512), dst=resized[i], interpolation=cv2.INTER_LINEAR)
+            # Upload uint8, then BGR->RGB, NHWC->NCHW and normalization on the device
+            batch = torch.from_numpy(resized).to(device, non_blocking=True)
+            batch = batch.permute(0, 3, 1, 2).flip(1).to(dtype)
+            batch = batch.mul_(self._effdet_scale).sub_(self._effdet_shift)
+            if device.type == "cpu":
+                batch = batch.contiguous(memory_format=torch.channels_last)
+            with torch.no_grad(), self._autocast():
+                pred = self._forward(model_id, model, batch)
+            # effdet returns one entry per batch item, in 512x512 input coordinates
+            return [
+                self._parse_effdet(pred_i, conf, class_filter,
+                                   scale=(image.shape[1] / 512, image.shape[0] / 512))
+                for pred_i, image in zip(pred, images)
+            ]
 
         raise ValueError("Unsupported backend")
 
+    def detect_batch_tensor(self, model_id: str, frames: torch.Tensor, conf: float = 0.25,
+                            class_filter: Optional[Iterable[str]] = None,
+                            graph_batch: Optional[int] = None,
+                            ready: Optional["torch.cuda.Event"] = None) -> List[Dict[str, Any]]:
+        """
+        Detect objects in a (N, 3, H, W) uint8 RGB batch that may already live on the GPU
+        
+        YOLO letterboxes and runs the batch without leaving the device; other
+        backends get host BGR arrays and go through detect_batch.
+        
+        Args:
+            graph_batch: On CUDA, pad YOLO batches up to this size and replay a
+                captured CUDA graph, so a video's batches (including the last,
+                partial one) share a single capture
+            ready: Event recorded when an async upload of `frames` completes
+        """
+        if ready is not None:
+            torch.cuda.current_stream(frames.device).wait_event(ready)
+        backend = model_id.split("/", 1)[0]
+        model, _, device = self.load_model(model_id) if backend == "yolo" else (None, None, None)
+        if backend != "yolo" or isinstance(model, OnnxYOLO):
+            images = list(frames.flip(1).permute(0, 2, 3, 1).contiguous().cpu().numpy())
+            return self.detect_batch(model_id, images, conf=conf, class_filter=class_filter)
+        
+        # TensorRT engines are built for at most ENGINE_MAX_BATCH images per run
+        if graph_batch:
+            graph_batch = min(graph_batch, ENGINE_MAX_BATCH)
+        if len(frames) > ENGINE_MAX_BATCH:
+            return [
+                detections
+                for start in range(0, len(frames), ENGINE_MAX_BATCH)
+                for detections in self.detect_batch_tensor(
+                    model_id, frames[start:start + ENGINE_MAX_BATCH], conf=conf,
+                    class_filter=class_filter, graph_batch=graph_batch
+                )
+            ]
+        
+        if class_filter:
+            class_filter = frozenset(class_filter)
+        
+        # Ultralytics runs tensor input as-is: it must be 0-1 float with sides divisible
+        # by the stride, so resize to fit 640 and pad bottom/right on the device.
+        # On CUDA the batch is built in FP16 to match the half-precision model.
+        half = device.type == "cuda"
+        height, width = frames.shape[-2:]
+        ratio = min(640 / height, 640 / width)
+        new_h, new_w = round(height * ratio), round(width * ratio)
+        batch = frames.to(device, non_blocking=True)
+        batch = (batch.half() if half else batch.float()).div_(255.)
+        batch = F.interpolate(batch, size=(new_h, new_w), mode="bilinear", align_corners=False)
+        batch = F.pad(batch, (0, -new_w % 32, 0, -new_h % 32), value=114 / 255.)
+        
+        count = len(batch)
+        graph_shape = (max(count, graph_batch or 0), *batch.shape[1:])
+        runner = self._yolo_graph(model_id, model, graph_shape) if half and graph_batch else None
+        if runner is not None:
+            if count < graph_batch:
+                batch = F.pad(batch, (0, 0, 0, 0, 0, 0, 0, graph_batch - count))
+            try:
+                preds = runner(batch)[:count]
+                # Same NMS the Ultralytics predictor applies; it reads the static
+                # output before the next replay overwrites it
+                nms = non_max_suppression(preds, conf_thres=conf, iou_thres=0.7, max_det=300)
+                return [self._parse_yolo_nms(det, model.names, ratio, (height, width), class_filter)
+                        for det in nms]
+            except Exception as e:
+                print(f"CUDA graph capture failed for {model_id}, using predict(): {str(e)}")
+                self._yolo_graph_failed.add(model_id)
+                self._yolo_graphs.pop((model_id, graph_shape), None)
+                batch = batch[:count]
+        
+        results = model.predict(batch, conf=conf, half=half, verbose=False)
+        batch_detections = []
+        for result in results:
+            detections = self._parse_yolo(result, class_filter)
+            detections["bboxes"] = self._unletterbox(detections["bboxes"], ratio, (height, width))
+            batch_detections.append(detections)
+        return batch_detections
+
+    def _detr_inputs(self, images: List[np.ndarray]):
+        """Resize and normalize BGR arrays the way DetrImageProcessor does, without PIL"""
+        size = self._detr_processor.size or {}
+        shortest_edge = size.get("shortest_edge", 800)
+        longest_edge = size.get("longest_edge", 1333)
+        mean = self._detr_mean
+        std = self._detr_std
+
+        resized = []
+        for image in images:
+            h, w = image.shape[:2]
+            scale = min(shortest_edge / min(h, w), longest_edge / max(h, w))
+            new_size = (int(round(w * scale)), int(round(h * scale)))
+            resized.append(cv2.resize(image, new_size, interpolation=cv2.INTER_LINEAR))
+
+        # Pad to a common size; pixel_mask marks the valid region of each image
+        max_h = max(img.shape[0] for img in resized)
+        max_w = max(img.shape[1] for img in resized)
+        pixel_values = torch.zeros((len(resized), 3, max_h, max_w))
+        pixel_mask = torch.zeros((len(resized), max_h, max_w), dtype=torch.long)
+        for i, img in enumerate(resized):
+            h, w = img.shape[:2]
+            tensor = torch.from_numpy(np.ascontiguousarray(img[:, :, ::-1])).permute(2, 0, 1).float().div_(255.)
+            pixel_values[i, :, :h, :w] = tensor.sub_(mean).div_(std)
+            pixel_mask[i, :h, :w] = 1
+        return pixel_values, pixel_mask
+
+    @staticmethod
+    def _to_detections(boxes: np.ndarray, scores: np.ndarray, class_names: List[str],
+                       conf: Optional[float], class_filter: Optional[frozenset],
+                       class_ids: np.ndarray) -> Dict[str, Any]:
+        """
+        Mask host-side arrays by confidence and class into columnar detections
+
+        class_ids are the integer labels behind class_names; they are kept as
+        a column so per-class counts can be taken with one vectorized pass.
+        """
+        keep = np.ones(len(scores), dtype=bool)
+        if conf is not None:
+            keep &= scores >= conf
+        if class_filter:
+            keep &= np.fromiter((name in class_filter for name in class_names), dtype=bool,
+                                count=len(class_names))
+        kept_names = [name for name, kept in zip(class_names, keep) if kept]
+        return {
+            "classes": kept_names,
+            "class_ids": np.asarray(class_ids, dtype=np.int64)[keep],
+            "confidences": scores[keep],
+            "bboxes": boxes[keep].reshape(-1, 4),
+            "count": len(kept_names)
+        }
+
+    @staticmethod
+    def _no_detections() -> Dict[str, Any]:
+        return {
+            "classes": [],
+            "class_ids": np.empty(0, dtype=np.int64),
+            "confidences": np.empty(0, dtype=np.float32),
+            "bboxes": np.empty((0, 4), dtype=np.float32),
+            "count": 0
+        }
+
+    @staticmethod
+    def _parse_yolo_nms(det: torch.Tensor, names, ratio: float, image_shape: Tuple[int, int],
+                        class_filter: Optional[frozenset]) -> Dict[str, Any]:
+        """Columnar detections from one (K, 6) NMS output on a letterboxed (height, width) image"""
+        det = det.float().cpu().numpy()
+        class_ids = det[:, 5].astype(int)
+        class_names = [names[class_id] for class_id in class_ids]
+        boxes = MultiModelManager._unletterbox(det[:, :4], ratio, image_shape)
+        return MultiModelManager._to_detections(boxes, det[:, 4], class_names,
+                                                None, class_filter, class_ids)
+
+    @staticmethod
+    def _unletterbox(boxes: np.ndarray, ratio: float, image_shape: Tuple[int, int]) -> np.ndarray:
+        """Map xyxy boxes from a letterboxed input back to the image, clipped to its bounds"""
+        # Padding is bottom/right only, so undoing the resize is a pure scale; boxes
+        # can reach into the padding, so clamp them to the (height, width) image
+        height, width = image_shape
+        boxes = boxes / ratio
+        np.clip(boxes[:, 0::2], 0, width, out=boxes[:, 0::2])
+        np.clip(boxes[:, 1::2], 0, height, out=boxes[:, 1::2])
+        return boxes
+
+    @staticmethod
+    def _parse_yolo(result, class_filter: Optional[frozenset]) -> Dict[str, Any]:
+        boxes = result.boxes
+        if boxes is None or len(boxes) == 0:
+            print("No boxes detected")
+            return MultiModelManager._no_detections()
+        # One device->host transfer per tensor instead of one per box
+        xyxy = boxes.xyxy.cpu().numpy()
+        scores = boxes.conf.cpu().numpy()
+        class_ids = boxes.cls.cpu().numpy().astype(int)
+        class_names = [result.names[class_id] for class_id in class_ids]
+        # Ultralytics already applied the confidence threshold
+        return MultiModelManager._to_detections(xyxy, scores, class_names, None, class_filter, class_ids)
+
+    @staticmethod
+    def _parse_torchvision(outputs, categories, conf: float,
+                           class_filter: Optional[frozenset]) -> Dict[str, Any]:
+        boxes = outputs["boxes"].float().cpu().numpy()
+        scores = outputs["scores"].float().cpu().numpy()
+        labels = outputs["labels"].cpu().numpy().astype(int)
+        if categories:
+            class_names = [categories[i] if 0 <= i < len(categories) else str(i) for i in labels]
+        else:
+            class_names = [str(i) for i in labels]
+        return MultiModelManager._to_detections(boxes, scores, class_names, conf, class_filter, labels)
+
+    @staticmethod
+    def _decode_detr(outputs):
+        """
+        Best non-background class per query and corner-form boxes, for the whole batch
+
+        Returns:
+            (boxes, scores, labels) host arrays of shape (B, Q, 4), (B, Q), (B, Q);
+            boxes are normalized xyxy relative to each unpadded image
+        """
+        probs = outputs.logits.float().softmax(-1)[..., :-1]
+        scores, labels = probs.max(-1)
+        cx, cy, w, h = outputs.pred_boxes.float().unbind(-1)
+        boxes = torch.stack((cx - 0.5 * w, cy - 0.5 * h, cx + 0.5 * w, cy + 0.5 * h), dim=-1)
+        return boxes.cpu().numpy(), scores.cpu().numpy(), labels.cpu().numpy()
+
+    @staticmethod
+    def _parse_detr(boxes: np.ndarray, scores: np.ndarray, labels: np.ndarray, image_shape,
+                    conf: float, class_filter: Optional[frozenset]) -> Dict[str, Any]:
+        height, width = image_shape[:2]
+        boxes = boxes * np.array([width, height, width, height], dtype=boxes.dtype)
+        class_names = [str(i) for i in labels.tolist()]
+        return MultiModelManager._to_detections(boxes, scores, class_names, conf, class_filter, labels)
+
+    @staticmethod
+    def _parse_effdet(pred0, conf: float, class_filter: Optional[frozenset],
+                      scale=(1.0, 1.0)) -> Dict[str, Any]:
+        boxes = scores = labels = None
+        if isinstance(pred0, (list, tuple)) and len(pred0) == 3:
+            boxes, scores, labels = pred0
+        elif hasattr(pred0, "get"):
+            boxes = pred0.get("boxes")
+            scores = pred0.get("scores")
+            labels = pred0.get("labels") or pred0.get("classes")
+        elif isinstance(pred0, torch.Tensor):
+            # Nx6: x1,y1,x2,y2,score,label
+            arr = pred0.float().cpu().numpy()
+            if arr.ndim == 2 and arr.shape[1] >= 6:
+                boxes = arr[:, 0:4]
+                scores = arr[:, 4]
+                labels = arr[:, 5]
+        if boxes is None or scores is None or labels is None:
+            return MultiModelManager._no_detections()
+        boxes = np.asarray(boxes.float().cpu() if isinstance(boxes, torch.Tensor) else boxes, dtype=np.float64)
+        scores = np.asarray(scores.float().cpu() if isinstance(scores, torch.Tensor) else scores, dtype=np.float64)
+        labels = np.asarray(labels.cpu() if isinstance(labels, torch.Tensor) else labels).astype(int)
+        sx, sy = scale
+        boxes = boxes[:, :4] * np.array([sx, sy, sx, sy])
+        class_names = [str(i) for i in labels]
+        return MultiModelManager._to_detections(boxes, scores, class_names, conf, class_filter, labels)
+
+def class_counts(detections: Dict[str, Any]) -> Dict[str, int]:
+    """
+    Per-class object counts for columnar detections
+
+    Counts the integer class_ids with np.bincount and maps each non-empty bin
+    back to its name, instead of hashing every class name string.
+    """
+    class_ids = detections["class_ids"]
+    if not len(class_ids):
+        return {}
+    present, first = np.unique(class_ids, return_index=True)
+    counts = np.bincount(class_ids)[present]
+    # Each present id takes its name from its first detection; ids can share a
+    # name (torchvision's COCO list repeats "N/A"), so sum per name
+    names = detections["classes"]
+    counts_by_name: Dict[str, int] = {}
+    for i, count in sorted(zip(first.tolist(), counts.tolist())):
+        counts_by_name[names[i]] = counts_by_name.get(names[i], 0) + count
+    return counts_by_name
+
+class AsDictAdapter(Sequence):
+    """Read-only list-of-dicts view over columnar detections, for the per-object API"""
+
+    def __init__(self, detections: Dict[str, Any]):
+        self._detections = detections
+
+    def __len__(self):
+        return self._detections["count"]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return {
+            "class": self._detections["classes"][index],
+            "confidence": float(self._detections["confidences"][index]),
+            "bbox": self._detections["bboxes"][index].tolist(),
+            "shape": "rect"
+        }
+
+    def to_list(self) -> List[Dict[str, Any]]:
+        """Materialize every object at once with bulk tolist() conversions"""
+        d = self._detections
+        return [
+            {"class": class_name, "confidence": score, "bbox": bbox, "shape": "rect"}
+            for class_name, score, bbox in zip(d["classes"], d["confidences"].tolist(), d["bboxes"].tolist())
+        ]
+
 # Import exporter
 from core.exporter import Exporter
+from core.pipeline import PipelineRunner
+from core.model_manager import ENGINE_MAX_BATCH, INT8_AVAILABLE, load_yolo
+from core.onnx_runtime import ORT_AVAILABLE, OnnxYOLO
+from core._draw_kernels import NUMBA_AVAILABLE as NUMBA_DRAW_AVAILABLE, draw_rects, fill_rects
+
+# One thread-tuned session per ONNX export, bounded like load_yolo's cache
+_onnx_yolo = lru_cache(maxsize=2)(OnnxYOLO)
+
+
+class InvalidImageError(ValueError):
+    """Raised when an uploaded file can't be decoded as an image"""
+
+
+class InvalidVideoError(ValueError):
+    """Raised when an uploaded video can't be opened"""
+
+
+class UploadTooLargeError(ValueError):
+    """Raised when an upload exceeds the size limit"""
+
+
+MAX_FILE_SIZE = 50 * 1024 * 1024  # 50MB limit
+MAX_IMAGES = 50  # Per batch/folder request, to prevent memory exhaustion
+# Video frames per forward pass; lower it on small GPUs or to trade throughput for power
+VIDEO_BATCH_SIZE = max(1, int(os.environ.get("AUTOOD_VIDEO_BATCH", "16")))
+# Uploaded images per forward pass, for every backend; torchvision resizes to
+# 800-1333px and DETR pads to the largest image, so a whole request won't fit
+DETECT_BATCH_MAX = VIDEO_BATCH_SIZE
+# Decoded images a batch/folder request holds at once; its files are decoded
+# and inferred this many at a time
+DECODED_IMAGES_MAX = max(1, int(os.environ.get("AUTOOD_DECODED_IMAGES", "4")))
+# Decoded frames the reader thread may run ahead of inference
+VIDEO_PREFETCH = 32
+UPLOAD_CHUNK_SIZE = 256 * 1024
+MAX_VIDEO_SIZE = 200 * 1024 * 1024  # 200MB limit
+VIDEO_COPY_CHUNK_SIZE = 1024 * 1024
+
+
+def parse_class_filter(class_filter: Optional[str]) -> Optional[frozenset]:
+    """Parse a JSON list or comma-separated class filter into a set for O(1) lookups"""
+    if not class_filter:
+        return None
+    try:
+        classes = orjson.loads(class_filter)
+        if isinstance(classes, str):
+            classes = [classes]
+        classes = frozenset(classes)
+        print(f"Class filter applied: {sorted(classes)}")
+    except (orjson.JSONDecodeError, TypeError):
+        classes = frozenset(c.strip() for c in class_filter.split(",") if c.strip())
+        print(f"Class filter (parsed): {sorted(classes)}")
+    return classes or None
+
+
+PRECISIONS = ("auto", "int8", "fp32")
+
+@dataclass(frozen=True)
+class DetectionParams:
+    model: str
+    confidence: float
+    class_filter: Optional[frozenset] = None
+    # Return detections as column arrays instead of one dict per object
+    columnar: bool = False
+    # "auto", "int8" or "fp32"; see MultiModelManager.load_model
+    precision: str = "auto"
+
+
+# JPEG start-of-frame markers carry the image dimensions (C4/C8/CC are not SOF)
+_JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+def _jpeg_size(contents: bytes) -> Optional[tuple]:
+    """Read (width, height) from a JPEG's SOF segment without decoding it"""
+    if contents[:2] != b"\xff\xd8":
+        return None
+    pos = 2
+    end = len(contents)
+    while pos + 9 <= end:
+        if contents[pos] != 0xFF:
+            return None
+        marker = contents[pos + 1]
+        if marker == 0xFF:
+            # Fill byte before a marker
+            pos += 1
+            continue
+        if marker in _JPEG_SOF_MARKERS:
+            height = int.from_bytes(contents[pos + 5:pos + 7], "big")
+            width = int.from_bytes(contents[pos + 7:pos + 9], "big")
+            return width, height
+        if marker == 0xDA:
+            # Start of scan without a frame header - malformed
+            return None
+        pos += 2 + int.from_bytes(contents[pos + 2:pos + 4], "big")
+    return None
+
+# Longest input side each model resizes to (torchvision's R-CNN/RetinaNet and
+# DETR cap the long side at 1333); keyed by model id, then by backend
+MODEL_INPUT_SIZES = {
+    "torchvision/ssd300_vgg16": 300,
+    "yolo": 640,
+    "torchvision": 1333,
+    "transformers": 1333,
+    "effdet": 512,
+}
+
+def _model_input_size(model_id: str) -> int:
+    """Longest side a model's preprocessing resizes images to"""
+    return MODEL_INPUT_SIZES.get(model_id, MODEL_INPUT_SIZES.get(model_id.split("/", 1)[0], 1333))
+
+def _decode_flags(size: Optional[tuple], input_size: int) -> int:
+    """
+    Let libjpeg downscale while decoding when the input is far above model resolution
+    
+    A reduction factor is only used when the reduced image's long side still
+    covers the model's input_size, so the model never sees upsampled pixels.
+    """
+    if size is None:
+        return cv2.IMREAD_COLOR
+    longest = max(size)
+    if longest > 4 * input_size:
+        return cv2.IMREAD_REDUCED_COLOR_4
+    if longest > 2 * input_size:
+        return cv2.IMREAD_REDUCED_COLOR_2
+    return cv2.IMREAD_COLOR
+
+@dataclass
+class DecodedImage:
+    image: np.ndarray
+    # (width, height) of the upload; differs from image.shape when decoded reduced
+    original_size: tuple
+
+def _upload_size(file: UploadFile) -> Optional[int]:
+    """Size of an upload without reading it, if the request declared it"""
+    if file.size is not None:
+        return file.size
+    length = file.headers.get("content-length")
+    try:
+        return int(length) if length else None
+    except ValueError:
+        return None
+
+def _read_upload(file: UploadFile, max_size: int = MAX_FILE_SIZE) -> bytearray:
+    """
+    Read a spooled upload into a single buffer, in fixed-size chunks
+    
+    Blocking; call it from a worker thread. The buffer is preallocated when
+    the size is known, so the chunks are never held twice.
+    """
+    size = _upload_size(file)
+    if size is not None and size > max_size:
+        raise UploadTooLargeError(f"File too large - maximum {max_size // (1024 * 1024)}MB")
+    
+    src = file.file
+    src.seek(0)
+    if size is None:
+        buf = bytearray()
+        while chunk := src.read(UPLOAD_CHUNK_SIZE):
+            buf += chunk
+            if len(buf) > max_size:
+                raise UploadTooLargeError(f"File too large - maximum {max_size // (1024 * 1024)}MB")
+        return buf
+    
+    buf = bytearray(size)
+    with memoryview(buf) as view:
+        pos = 0
+        while pos < size:
+            chunk = src.read(min(UPLOAD_CHUNK_SIZE, size - pos))
+            if not chunk:
+                break
+            view[pos:pos + len(chunk)] = chunk
+            pos += len(chunk)
+    del buf[pos:]
+    return buf
+
+# Pipeline stages: decode (thread pool) -> detect (inference thread) -> build response
+def _decode_upload(file: UploadFile, params: DetectionParams) -> DecodedImage:
+    """Read and decode an upload to a BGR array, reduced for oversized JPEGs"""
+    # Reading happens here so at most decode_workers raw uploads are in memory at once
+    contents = _read_upload(file)
+    nparr = np.frombuffer(contents, np.uint8)
+    size = _jpeg_size(contents)
+    img = cv2.imdecode(nparr, _decode_flags(size, _model_input_size(params.model)))
+    if img is None:
+        raise InvalidImageError("Invalid image file - could not decode")
+    
+    if size is None:
+        size = (img.shape[1], img.shape[0])
+    elif (size[0] > size[1]) != (img.shape[1] > img.shape[0]):
+        # imdecode applied an EXIF rotation, swapping the SOF axes
+        size = (size[1], size[0])
+    
+    return DecodedImage(img, size)
+
+def _to_original_scale(decoded: DecodedImage, detections: Dict[str, Any]):
+    """Map boxes from the decoded image back to upload coordinates"""
+    width, height = decoded.original_size
+    sx = width / decoded.image.shape[1]
+    sy = height / decoded.image.shape[0]
+    if sx != 1 or sy != 1:
+        detections["bboxes"] = detections["bboxes"] * np.array([sx, sy, sx, sy])
+    return (height, width), detections
+
+def _run_detection(decoded: DecodedImage, params: DetectionParams):
+    """Run the model on a decoded image"""
+    detections = model_manager.detect(
+        params.model, decoded.image, conf=params.confidence, class_filter=params.class_filter,
+        precision=params.precision
+    )
+    return _to_original_scale(decoded, detections)
+
+def _run_detection_batch(decoded: List[DecodedImage], params: DetectionParams):
+    """Run the model over several decoded images, DETECT_BATCH_MAX per forward pass"""
+    batch_detections = []
+    for start in range(0, len(decoded), DETECT_BATCH_MAX):
+        batch_detections.extend(model_manager.detect_batch(
+            params.model, [item.image for item in decoded[start:start + DETECT_BATCH_MAX]],
+            conf=params.confidence, class_filter=params.class_filter, precision=params.precision
+        ))
+    return [_to_original_scale(item, detections) for item, detections in zip(decoded, batch_detections)]
+
+def _build_result(value, params: DetectionParams) -> Dict[str, Any]:
+    """Assemble the per-image detection response"""
+    shape, detections = value
+    
+    return {
+        "detections": detections if params.columnar else AsDictAdapter(detections).to_list(),
+        "image_size": {
+            "width": shape[1],
+            "height": shape[0]
+        },
+        "total_objects": detections["count"],
+        "class_counts": class_counts(detections)
+    }
+
+def _error_result(filename: str, error: str) -> Dict[str, Any]:
+    """Per-file entry for images that could not be processed"""
+    return {
+        "filename": filename,
+        "error": error,
+        "detections": [],
+        "image_size": {"width": 0, "height": 0},
+        "total_objects": 0,
+        "class_counts": {}
+    }
 
 # Helper functions for detection
 def detect_objects_in_image(model_manager, image, model_name: str, conf: float = 0.25, 
@@ -293,44 +978,74 @@ def detect_objects_in_image(model_manager, image, model_name: str, conf: float =
     
     return detections
 
-def draw_annotations(image: np.ndarray, detections: List[Dict], 
+# Below this many boxes the per-box cv2 calls are cheaper than a kernel launch
+NUMBA_DRAW_MIN_BOXES = 64
+
+def draw_annotations(image: np.ndarray, detections: Dict[str, Any], 
                     color: tuple = (102, 126, 234), thickness: int = 2) -> np.ndarray:
-    """Draw bounding boxes on image"""
-    img_copy = image.copy()
+    """Draw bounding boxes from columnar detections; mutates and returns `image`"""
+    boxes = np.asarray(detections["bboxes"]).reshape(-1, 4).astype(np.int32)
+    labels = [
+        f"{class_name} {score:.2f}"
+        for class_name, score in zip(detections["classes"], np.asarray(detections["confidences"]).tolist())
+    ]
     
-    for det in detections:
-        bbox = det['bbox']
-        x1, y1, x2, y2 = map(int, bbox)
-        
-        # Draw rectangle
-        cv2.rectangle(img_copy, (x1, y1), (x2, y2), color, thickness)
-        
-        # Draw label
-        label = f"{det['class']} {det['confidence']:.2f}"
-        
-        # Get text size for background
-        (text_width, text_height), baseline = cv2.getTextSize(
-            label, cv2.FONT_HERSHEY_SIMPLEX, 0.5, thickness
-        )
-        
-        # Draw background rectangle for text
-        cv2.rectangle(
-            img_copy, 
-            (x1, y1 - text_height - baseline - 5), 
-            (x1 + text_width, y1), 
-            color, 
-            -1
-        )
-        
-        # Draw text
+    # Label background boxes sit on top of each detection's top edge
+    text_sizes = [
+        cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.5, thickness) for label in labels
+    ]
+    label_boxes = np.array([
+        (x1, y1 - text_height - baseline - 5, x1 + text_width, y1)
+        for (x1, y1, _, _), ((text_width, text_height), baseline) in zip(boxes.tolist(), text_sizes)
+    ], dtype=np.int32).reshape(-1, 4)
+    
+    if NUMBA_DRAW_AVAILABLE and len(boxes) >= NUMBA_DRAW_MIN_BOXES:
+        # All rectangles in one parallel pass instead of one cv2 call per box
+        color_arr = np.asarray(color, dtype=image.dtype)
+        draw_rects(image, boxes, color_arr, thickness)
+        fill_rects(image, label_boxes, color_arr)
+    else:
+        for (x1, y1, x2, y2), (lx1, ly1, lx2, ly2) in zip(boxes.tolist(), label_boxes.tolist()):
+            cv2.rectangle(image, (x1, y1), (x2, y2), color, thickness)
+            cv2.rectangle(image, (lx1, ly1), (lx2, ly2), color, -1)
+    
+    # Text rendering stays in OpenCV
+    for label, (x1, y1, _, _) in zip(labels, boxes.tolist()):
         cv2.putText(
-            img_copy, label, (x1, y1 - 5), 
+            image, label, (x1, y1 - 5), 
             cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), thickness
         )
     
-    return img_copy
+    return image
 
-app = FastAPI(title="AutoOD API", version="1.0.0")
+JPEG_QUALITY = 85
+_turbo_jpeg = None
+
+def encode_jpeg(image: np.ndarray, quality: int = JPEG_QUALITY) -> bytes:
+    """Encode a BGR image as JPEG, with libjpeg-turbo's SIMD encoder when available"""
+    global _turbo_jpeg
+    if TurboJPEG is not None and _turbo_jpeg is None:
+        try:
+            _turbo_jpeg = TurboJPEG()
+        except (OSError, RuntimeError):
+            # Python bindings installed but the shared library is missing; don't retry
+            _turbo_jpeg = False
+    if _turbo_jpeg:
+        return _turbo_jpeg.encode(image, quality=quality, pixel_format=TJPF_BGR)
+    _, buffer = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    return buffer.tobytes()
+
+def _annotate_jpeg(image: np.ndarray, detections: Dict[str, Any]) -> bytes:
+    """Draw detections on a BGR image (in place) and encode the result"""
+    annotated_img = draw_annotations(
+        image,
+        detections,
+        color=(234, 126, 102),  # Purple color (BGR)
+        thickness=3
+    )
+    return encode_jpeg(annotated_img)
+
+app = FastAPI(title="AutoOD API", version="1.0.0", default_response_class=ORJSONResponse)
 
 # CORS middleware to allow React frontend to communicate
 app.add_middleware(
@@ -344,6 +1059,296 @@ app.add_middleware(
 # Initialize core components
 model_manager = MultiModelManager()
 exporter = Exporter()
+# Concurrent /api/detect requests for the same model and settings are coalesced
+# into one forward pass of up to MICROBATCH_MAX images, gathered for MICROBATCH_MS
+MICROBATCH_MAX = VIDEO_BATCH_SIZE
+MICROBATCH_MS = float(os.environ.get("AUTOOD_MICROBATCH_MS", "10"))
+
+pipeline = PipelineRunner(_decode_upload, _run_detection, _build_result,
+                          batch_infer_fn=_run_detection_batch,
+                          max_batch=MICROBATCH_MAX, batch_window_ms=MICROBATCH_MS)
+
+# Folder uploads are written here once and served back by /api/image/{image_id};
+# the oldest are evicted once the directory passes either limit
+UPLOAD_DIR = Path(tempfile.gettempdir()) / "autood_uploads"
+UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+UPLOAD_MAX_FILES = int(os.environ.get("AUTOOD_UPLOAD_MAX_FILES", "1000"))
+UPLOAD_MAX_BYTES = int(os.environ.get("AUTOOD_UPLOAD_MAX_MB", "1024")) * 1024 * 1024
+
+# Video detection responses keyed by upload content and request parameters, so
+# re-running the same clip with the same settings skips decode and inference
+VIDEO_CACHE_DIR = Path(tempfile.gettempdir()) / "autood_cache"
+VIDEO_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+VIDEO_CACHE_MAX_FILES = 64
+VIDEO_CACHE_MEMORY_ENTRIES = 8
+
+def _video_hasher():
+    """Content hash for video uploads: xxh3 when installed, BLAKE2b otherwise"""
+    return xxhash.xxh3_128() if xxhash is not None else hashlib.blake2b(digest_size=16)
+
+def _save_video_upload(file: UploadFile, max_size: int = MAX_VIDEO_SIZE) -> Tuple[str, str]:
+    """
+    Copy a spooled video upload to a temporary file in 1MB chunks, hashing it on the way
+    
+    Blocking; call it from a worker thread. The size limit is enforced while
+    copying, so an upload without a declared size is never written in full.
+    
+    Returns:
+        (path of the temporary file, hex digest of its contents); the caller
+        deletes the file
+    """
+    src = file.file
+    src.seek(0)
+    written = 0
+    hasher = _video_hasher()
+    with tempfile.NamedTemporaryFile(delete=False, suffix='.mp4') as tmp_file:
+        try:
+            while chunk := src.read(VIDEO_COPY_CHUNK_SIZE):
+                written += len(chunk)
+                if written > max_size:
+                    raise UploadTooLargeError("Video file too large - maximum 200MB")
+                tmp_file.write(chunk)
+                hasher.update(chunk)
+        except BaseException:
+            tmp_file.close()
+            os.unlink(tmp_file.name)
+            raise
+    _advise_sequential_read(tmp_file.name)
+    return tmp_file.name, hasher.hexdigest()
+
+def _video_cache_key(digest: str, model: str, confidence: float, classes: Optional[frozenset],
+                     frame_interval: int, max_frames: int, precision: str = "auto") -> str:
+    """File-name-safe cache key for a video upload and its detection parameters"""
+    params = orjson.dumps([model, confidence, sorted(classes) if classes else None,
+                           frame_interval, max_frames, precision])
+    return f"{digest}-{hashlib.blake2b(params, digest_size=8).hexdigest()}"
+
+@lru_cache(maxsize=VIDEO_CACHE_MEMORY_ENTRIES)
+def _cached_video_response(key: str) -> bytes:
+    """Serialized response for a cache key; a miss raises FileNotFoundError and is not memoized"""
+    return (VIDEO_CACHE_DIR / f"{key}.json").read_bytes()
+
+def _store_video_response(key: str, body: bytes):
+    """Write a response into the disk cache, then drop the oldest entries past the limit"""
+    tmp_path = VIDEO_CACHE_DIR / f"{key}.{uuid.uuid4().hex}.tmp"
+    tmp_path.write_bytes(body)
+    os.replace(tmp_path, VIDEO_CACHE_DIR / f"{key}.json")
+    if _evict_oldest(VIDEO_CACHE_DIR, "*.json", VIDEO_CACHE_MAX_FILES):
+        # Don't keep serving evicted responses from memory
+        _cached_video_response.cache_clear()
+
+def _evict_oldest(directory: Path, pattern: str, max_files: int,
+                  max_bytes: Optional[int] = None) -> int:
+    """Delete the least recently written files matching pattern until both limits hold; returns how many"""
+    entries = []
+    for path in directory.glob(pattern):
+        with contextlib.suppress(FileNotFoundError):
+            stat = path.stat()
+            entries.append((stat.st_mtime, stat.st_size, path))
+    entries.sort()
+    
+    count = len(entries)
+    total = sum(size for _, size, _ in entries)
+    for _, size, stale in entries:
+        if count <= max_files and (max_bytes is None or total <= max_bytes):
+            break
+        stale.unlink(missing_ok=True)
+        count -= 1
+        total -= size
+    return len(entries) - count
+
+def _advise_sequential_read(path: str):
+    """
+    Tell the kernel a file is about to be read front to back (Linux only)
+    
+    WILLNEED starts readahead of the whole file into the page cache, so the
+    decoder does not stall on cold pages; SEQUENTIAL widens readahead for
+    reads on this descriptor.
+    """
+    if not hasattr(os, "posix_fadvise"):
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+def _store_upload(file: UploadFile, file_ext: str) -> str:
+    """Copy an upload under a fresh id and return that id"""
+    image_id = f"{uuid.uuid4().hex}{file_ext}"
+    file.file.seek(0)
+    with open(UPLOAD_DIR / image_id, "wb") as out:
+        shutil.copyfileobj(file.file, out, UPLOAD_CHUNK_SIZE)
+    return image_id
+
+class VideoReader:
+    """
+    Sequential frame sampler over a video file
+    
+    On CUDA devices with torchvision's NVDEC decoder, frames are decoded on
+    the GPU and yielded as (3, H, W) uint8 RGB CUDA tensors. Otherwise it
+    demuxes and decodes with PyAV (libav, threaded decoding) when it is
+    installed and can open the file, and with OpenCV as a last resort; those
+    paths yield BGR numpy arrays.
+    """
+    
+    def __init__(self, path: str, device: Optional[torch.device] = None):
+        self._gpu_reader = None
+        self._first_gpu_frame = None
+        self._container = None
+        self._cap = None
+        if (device is not None and device.type == "cuda"
+                and getattr(torchvision.io, "_HAS_GPU_VIDEO_DECODER", False)):
+            try:
+                self._gpu_reader = torchvision.io.VideoReader(path, "video", device="cuda")
+                meta = self._gpu_reader.get_metadata()["video"]
+                self.fps = float(meta["fps"][0])
+                self.total_frames = int(round(float(meta["duration"][0]) * self.fps))
+                # Frame size is only known once a frame is decoded
+                self._first_gpu_frame = self._to_chw(next(self._gpu_reader)["data"])
+                self.height, self.width = self._first_gpu_frame.shape[-2:]
+            except Exception as e:
+                print(f"GPU video decode unavailable, decoding on the CPU: {str(e)}")
+                self.close()
+        
+        if self._gpu_reader is None and av is not None:
+            try:
+                self._container = av.open(path)
+                self._stream = self._container.streams.video[0]
+                self._stream.thread_type = "AUTO"
+                self.width = self._stream.codec_context.width
+                self.height = self._stream.codec_context.height
+                self.fps = float(self._stream.average_rate or 0)
+                self.total_frames = self._stream.frames
+            except Exception as e:
+                print(f"PyAV could not open video, falling back to OpenCV: {str(e)}")
+                self.close()
+        
+        if self._gpu_reader is None and self._container is None:
+            self._cap = cv2.VideoCapture(path)
+            if not self._cap.isOpened():
+                self.close()
+                raise InvalidVideoError("Could not open video file")
+            self.total_frames = int(self._cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            self.fps = self._cap.get(cv2.CAP_PROP_FPS)
+            self.width = int(self._cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+            self.height = int(self._cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    
+    def sample(self, frame_interval: int, limit: int, buffer_count: int = 0):
+        """
+        Yield (frame_number, BGR frame) for every frame_interval-th frame, in one forward pass
+        
+        Args:
+            buffer_count: When > 0, the OpenCV path decodes into a ring of this
+                many preallocated frames; the consumer must hold at most that
+                many yielded frames at a time
+        """
+        frame_interval = max(1, frame_interval)
+        sampled = 0
+        if self._gpu_reader is not None:
+            frame_number = 0
+            frame = self._first_gpu_frame
+            self._first_gpu_frame = None
+            while frame is not None and sampled < limit:
+                if frame_number % frame_interval == 0:
+                    yield frame_number, frame
+                    sampled += 1
+                    if sampled >= limit:
+                        return
+                nxt = next(self._gpu_reader, None)
+                frame = self._to_chw(nxt["data"]) if nxt is not None else None
+                frame_number += 1
+            return
+        
+        if self._container is not None:
+            if limit <= 0:
+                return
+            # Only sampled frames are converted out of the decoder's YUV planes
+            for frame_number, frame in enumerate(self._container.decode(self._stream)):
+                if frame_number % frame_interval == 0:
+                    yield frame_number, frame.to_ndarray(format="bgr24")
+                    sampled += 1
+                    # Stop before decoding frames nobody will sample
+                    if sampled >= limit:
+                        return
+            return
+        
+        buffers = None
+        if buffer_count > 0:
+            buffers = np.empty((buffer_count, self.height, self.width, 3), dtype=np.uint8)
+        
+        # grab() decodes each frame once; only sampled frames pay for retrieve()
+        frame_number = 0
+        while sampled < limit and self._cap.grab():
+            if frame_number % frame_interval == 0:
+                out = buffers[sampled % buffer_count] if buffers is not None else None
+                ret, frame = self._cap.retrieve(out)
+                if ret:
+                    yield frame_number, frame
+                    sampled += 1
+                else:
+                    print(f"Warning: Could not read frame {frame_number}")
+            frame_number += 1
+    
+    @staticmethod
+    def _to_chw(frame: torch.Tensor) -> torch.Tensor:
+        # The NVDEC path returns HWC frames, the CPU one CHW
+        return frame.permute(2, 0, 1) if frame.shape[-1] == 3 else frame
+    
+    def close(self):
+        self._gpu_reader = None
+        self._first_gpu_frame = None
+        if self._container is not None:
+            self._container.close()
+            self._container = None
+        if self._cap is not None:
+            self._cap.release()
+            self._cap = None
+
+def _read_video_frames(reader: VideoReader, frame_interval: int, limit: int,
+                       read_q: queue.Queue, stop: threading.Event):
+    """Reader thread: push sampled (frame_number, frame) pairs, then None at EOF"""
+    # Frames in the queue, the one being put, and a batch held by inference
+    buffer_count = VIDEO_PREFETCH + VIDEO_BATCH_SIZE + 2
+    
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                read_q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    try:
+        for item in reader.sample(frame_interval, limit, buffer_count):
+            if not put(item):
+                return
+    except Exception as e:
+        put(e)
+    put(None)
+
+def _video_frame_results(batch: List[tuple], detections_batch: List[Dict[str, Any]],
+                         width: int, height: int, fps: float) -> List[Dict[str, Any]]:
+    """Aggregation stage: per-frame response entries for one inferred batch"""
+    results = []
+    for (frame_number, _), detections in zip(batch, detections_batch):
+        print(f"Frame {frame_number} - found {detections['count']} objects")
+        results.append({
+            "frame_number": frame_number,
+            "timestamp": frame_number / fps if fps > 0 else 0,
+            "detections": AsDictAdapter(detections).to_list(),
+            "image_size": {
+                "width": width,
+                "height": height
+            },
+            "total_objects": detections["count"],
+            "class_counts": class_counts(detections)
+        })
+    return results
 
 # Pydantic models for request/response
 class DetectionRequest(BaseModel):
@@ -381,18 +1386,45 @@ async def root():
         "version": "1.0.0"
     }
 
+@app.on_event("startup")
+async def _start_pipeline():
+    await pipeline.start()
+
+@app.on_event("shutdown")
+async def _stop_pipeline():
+    await pipeline.stop()
+
 @app.on_event("startup")
 async def _prefetch():
-    ids = [
-        "torchvision/fasterrcnn_resnet50_fpn",
-        "torchvision/retinanet_resnet50_fpn",
-        "torchvision/ssd300_vgg16",
-    ]
-    for mid in ids:
-        try:
-            model_manager.load_model(mid)
-        except Exception:
-            pass
+    """
+    Load and warm up the models listed in AUTOOD_PREFETCH
+    
+    The variable is a comma-separated list of model ids, or "all". Models
+    are otherwise loaded on first use.
+    """
+    requested = os.environ.get("AUTOOD_PREFETCH", "").strip()
+    if not requested:
+        return
+    if requested == "all":
+        ids = list(MultiModelManager.AVAILABLE)
+    else:
+        ids = [mid.strip() for mid in requested.split(",") if mid.strip()]
+    
+    loop = asyncio.get_running_loop()
+    
+    async def load(mid: str) -> str:
+        await loop.run_in_executor(loader, model_manager.load_model, mid)
+        return mid
+    
+    with ThreadPoolExecutor(max_workers=4, thread_name_prefix="autood-prefetch") as loader:
+        for loaded in asyncio.as_completed([load(mid) for mid in ids]):
+            try:
+                mid = await loaded
+                # Warm up on the inference thread so compiled graphs are captured
+                # where requests will replay them, not by the first request
+                await pipeline.run_inference(model_manager.warmup, mid)
+            except Exception as e:
+                print(f"Prefetch failed: {str(e)}")
 
 @app.get("/api/models")
 async def get_models():
@@ -410,57 +1442,35 @@ async def detect_objects(
     file: UploadFile = File(...),
     model: str = Form("yolo/yolov8n.pt"),
     confidence: float = Form(0.25),
-    class_filter: Optional[str] = Form(None)
+    class_filter: Optional[str] = Form(None),
+    columnar: bool = Form(False),
+    precision: str = Form("auto")
 ):
     """Detect objects in uploaded image"""
     try:
         print(f"Received detection request - model: {model}, confidence: {confidence}")
         
-        # Read image file
-        contents = await file.read()
-        print(f"Image file size: {len(contents)} bytes")
+        _check_precision(precision)
         
-        nparr = np.frombuffer(contents, np.uint8)
-        img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+        print(f"Image file size: {_upload_size(file)} bytes")
         
-        if img is None:
-            raise HTTPException(status_code=400, detail="Invalid image file - could not decode")
-        
-        print(f"Image decoded successfully - shape: {img.shape}")
-        
-        # Convert BGR to RGB for processing
-        img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-        
-        # Parse class filter
-        classes = None
-        if class_filter:
-            try:
-                classes = json.loads(class_filter)
-                print(f"Class filter applied: {classes}")
-            except:
-                classes = [c.strip() for c in class_filter.split(",") if c.strip()]
-                print(f"Class filter (parsed): {classes}")
+        classes = parse_class_filter(class_filter)
         
         print(f"Running detection with model: {model}")
-        detections = model_manager.detect(model, img_rgb, conf=confidence, class_filter=classes)
-        print(f"Detection completed - found {len(detections)} objects")
-        
-        # Calculate class counts
-        class_counts = {}
-        for det in detections:
-            cls = det['class']
-            class_counts[cls] = class_counts.get(cls, 0) + 1
+        result = await pipeline.submit(
+            file, DetectionParams(model, confidence, classes, columnar, precision)
+        )
+        print(f"Detection completed - found {result['total_objects']} objects")
         
-        return {
-            "detections": detections,
-            "image_size": {
-                "width": img.shape[1],
-                "height": img.shape[0]
-            },
-            "total_objects": len(detections),
-            "class_counts": class_counts
-        }
+        # Returned directly so orjson serializes the numpy columns without jsonable_encoder
+        return ORJSONResponse(result)
     
+    except HTTPException:
+        raise
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except InvalidImageError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         import traceback
         traceback.print_exc()
@@ -471,184 +1481,123 @@ async def detect_and_annotate(
     file: UploadFile = File(...),
     model: str = Form("yolo/yolov8n.pt"),
     confidence: float = Form(0.25),
-    class_filter: Optional[str] = Form(None)
+    class_filter: Optional[str] = Form(None),
+    precision: str = Form("auto")
 ):
     """Detect objects and return annotated image"""
     try:
+        _check_precision(precision)
+        
         # Read image file
-        contents = await file.read()
+        try:
+            contents = await asyncio.to_thread(_read_upload, file)
+        except UploadTooLargeError as e:
+            raise HTTPException(status_code=413, detail=str(e))
         nparr = np.frombuffer(contents, np.uint8)
         img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
         
         if img is None:
             raise HTTPException(status_code=400, detail="Invalid image file")
         
-        # Convert BGR to RGB
-        img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+        classes = parse_class_filter(class_filter)
         
-        # Parse class filter
-        classes = None
-        if class_filter:
-            try:
-                classes = json.loads(class_filter)
-            except:
-                classes = [c.strip() for c in class_filter.split(",") if c.strip()]
-        
-        detections = model_manager.detect(model, img_rgb, conf=confidence, class_filter=classes)
-        
-        # Draw annotations
-        annotated_img = draw_annotations(
-            img_rgb,
-            detections,
-            color=(102, 126, 234),  # Purple color
-            thickness=3
+        detections = await pipeline.run_inference(
+            model_manager.detect, model, img, confidence, classes, precision
         )
         
-        # Convert back to BGR for encoding
-        annotated_img_bgr = cv2.cvtColor(annotated_img, cv2.COLOR_RGB2BGR)
-        
-        # Encode image to bytes
-        _, buffer = cv2.imencode('.jpg', annotated_img_bgr)
-        
-        # Save to temporary file
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.jpg') as tmp:
-            tmp.write(buffer.tobytes())
-            tmp_path = tmp.name
+        # Draw and encode off the event loop; the JPEG is returned from memory
+        jpeg = await asyncio.to_thread(_annotate_jpeg, img, detections)
         
-        # Calculate class counts
-        class_counts = {}
-        for det in detections:
-            cls = det['class']
-            class_counts[cls] = class_counts.get(cls, 0) + 1
+        counts = class_counts(detections)
         
-        return FileResponse(
-            tmp_path,
+        return Response(
+            jpeg,
             media_type="image/jpeg",
             headers={
-                "X-Total-Objects": str(len(detections)),
-                "X-Class-Counts": json.dumps(class_counts)
+                "X-Total-Objects": str(detections["count"]),
+                "X-Class-Counts": json.dumps(counts)
             }
         )
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def _check_precision(precision: str):
+    if precision not in PRECISIONS:
+        raise HTTPException(status_code=400, detail=f"precision must be one of {', '.join(PRECISIONS)}")
+
+def _limit_files(files: List[UploadFile]) -> List[UploadFile]:
+    if len(files) > MAX_IMAGES:
+        print(f"Warning: Received {len(files)} files, limiting to {MAX_IMAGES}")
+        return files[:MAX_IMAGES]
+    return files
+
+async def _detect_uploads(files: List[UploadFile], params: DetectionParams) -> List[Dict[str, Any]]:
+    """
+    Detect objects in several uploads, DECODED_IMAGES_MAX per batched forward pass
+    
+    Returns:
+        One result per file in input order; files that are too large or fail
+        to decode get an error result instead
+    """
+    results: List[Optional[Dict[str, Any]]] = [None] * len(files)
+    pending = []
+    
+    for i, file in enumerate(files):
+        size = _upload_size(file)
+        print(f"Processing file {i+1}/{len(files)}: {file.filename} - {size} bytes")
+        
+        # Reject oversized files before any of their bytes are read
+        if size is not None and size > MAX_FILE_SIZE:
+            print(f"Warning: Skipping large file {file.filename} ({size} bytes)")
+            results[i] = _error_result(file.filename, "File too large - maximum 50MB")
+        else:
+            pending.append(i)
+    
+    # Read and decode a chunk concurrently, then run it as one batched forward
+    # pass; only one chunk's decoded arrays are alive at a time
+    outcomes = []
+    for start in range(0, len(pending), DECODED_IMAGES_MAX):
+        chunk = pending[start:start + DECODED_IMAGES_MAX]
+        outcomes.extend(await pipeline.submit_batch([files[i] for i in chunk], params))
+    for i, outcome in zip(pending, outcomes):
+        filename = files[i].filename
+        if isinstance(outcome, Exception):
+            print(f"Error processing file {filename}: {str(outcome)}")
+            results[i] = _error_result(filename, str(outcome))
+        else:
+            print(f"{filename} detection completed - found {outcome['total_objects']} objects")
+            results[i] = {"filename": filename, **outcome}
+    
+    return results
+
 @app.post("/api/detect-batch")
 async def detect_objects_batch(
     files: List[UploadFile] = File(...),
     model: str = Form("yolo/yolov8n.pt"),
     confidence: float = Form(0.25),
-    class_filter: Optional[str] = Form(None)
+    class_filter: Optional[str] = Form(None),
+    columnar: bool = Form(False),
+    precision: str = Form("auto")
 ):
     """Detect objects in multiple uploaded images"""
+    _check_precision(precision)
     try:
         print(f"Received batch detection request - {len(files)} files, model: {model}, confidence: {confidence}")
         
-        # Parse class filter
-        classes = None
-        if class_filter:
-            try:
-                classes = json.loads(class_filter)
-                print(f"Class filter applied: {classes}")
-            except:
-                classes = [c.strip() for c in class_filter.split(",") if c.strip()]
-                print(f"Class filter (parsed): {classes}")
-        
-        results = []
-        processed_count = 0
-        
-        # Limit maximum number of images to prevent memory exhaustion
-        MAX_IMAGES = 50
-        if len(files) > MAX_IMAGES:
-            print(f"Warning: Received {len(files)} files, limiting to {MAX_IMAGES}")
-            files = files[:MAX_IMAGES]
-        
-        for i, file in enumerate(files):
-            try:
-                # Read image file
-                contents = await file.read()
-                print(f"Processing file {i+1}/{len(files)}: {file.filename} - {len(contents)} bytes")
-                
-                # Validate file size to prevent memory issues
-                MAX_FILE_SIZE = 50 * 1024 * 1024  # 50MB limit
-                if len(contents) > MAX_FILE_SIZE:
-                    print(f"Warning: Skipping large file {file.filename} ({len(contents)} bytes)")
-                    results.append({
-                        "filename": file.filename,
-                        "error": "File too large - maximum 50MB",
-                        "detections": [],
-                        "image_size": {"width": 0, "height": 0},
-                        "total_objects": 0,
-                        "class_counts": {}
-                    })
-                    continue
-                
-                nparr = np.frombuffer(contents, np.uint8)
-                img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-                
-                if img is None:
-                    print(f"Warning: Could not decode image {file.filename}")
-                    results.append({
-                        "filename": file.filename,
-                        "error": "Invalid image file - could not decode",
-                        "detections": [],
-                        "image_size": {"width": 0, "height": 0},
-                        "total_objects": 0,
-                        "class_counts": {}
-                    })
-                    continue
-                
-                print(f"Image {i+1} decoded successfully - shape: {img.shape}")
-                
-                # Convert BGR to RGB for processing
-                img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-                
-                # Run detection
-                detections = model_manager.detect(model, img_rgb, conf=confidence, class_filter=classes)
-                print(f"Image {i+1} detection completed - found {len(detections)} objects")
-                
-                # Calculate class counts
-                class_counts = {}
-                for det in detections:
-                    cls = det['class']
-                    class_counts[cls] = class_counts.get(cls, 0) + 1
-                
-                results.append({
-                    "filename": file.filename,
-                    "detections": detections,
-                    "image_size": {
-                        "width": img.shape[1],
-                        "height": img.shape[0]
-                    },
-                    "total_objects": len(detections),
-                    "class_counts": class_counts
-                })
-                
-                processed_count += 1
-                
-                # Clear memory after processing each image
-                del contents
-                del nparr
-                del img
-                del img_rgb
-                
-            except Exception as e:
-                print(f"Error processing file {file.filename}: {str(e)}")
-                results.append({
-                    "filename": file.filename,
-                    "error": str(e),
-                    "detections": [],
-                    "image_size": {"width": 0, "height": 0},
-                    "total_objects": 0,
-                    "class_counts": {}
-                })
+        files = _limit_files(files)
+        params = DetectionParams(model, confidence, parse_class_filter(class_filter), columnar,
+                                 precision)
+        results = await _detect_uploads(files, params)
         
-        return {
+        return ORJSONResponse({
             "results": results,
             "total_images": len(files),
-            "successful_detections": len([r for r in results if not r.get("error")]),
+            "successful_detections": sum(1 for r in results if not r.get("error")),
             "total_objects": sum(r["total_objects"] for r in results)
-        }
+        })
         
     except Exception as e:
         import traceback
@@ -657,389 +1606,389 @@ async def detect_objects_batch(
 
 @app.post("/api/detect-folder")
 async def detect_objects_folder(
+    request: Request,
     files: List[UploadFile] = File(...),
     model: str = Form("yolo/yolov8n.pt"),
     confidence: float = Form(0.25),
-    class_filter: Optional[str] = Form(None)
+    class_filter: Optional[str] = Form(None),
+    precision: str = Form("auto")
 ):
     """Detect objects in multiple uploaded files from folder selection"""
+    _check_precision(precision)
     try:
         print(f"Received folder detection request - {len(files)} files, model: {model}, confidence: {confidence}")
         
-        # Parse class filter
-        classes = None
-        if class_filter:
-            try:
-                classes = json.loads(class_filter)
-                print(f"Class filter applied: {classes}")
-            except:
-                classes = [c.strip() for c in class_filter.split(",") if c.strip()]
-                print(f"Class filter (parsed): {classes}")
-        
-        results = []
-        image_files = []
-        processed_count = 0
-        
-        # Limit maximum number of images to prevent memory exhaustion
-        MAX_IMAGES = 50
-        if len(files) > MAX_IMAGES:
-            print(f"Warning: Received {len(files)} files, limiting to {MAX_IMAGES}")
-            files = files[:MAX_IMAGES]
-        
-        for i, file in enumerate(files):
-            try:
-                # Check if it's an image file by extension
-                filename = file.filename or ""
-                valid_extensions = ['.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.webp']
-                file_ext = os.path.splitext(filename.lower())[1]
-                
-                if file_ext not in valid_extensions:
-                    print(f"Skipping non-image file: {filename}")
-                    continue
-                
-                # Read image file
-                contents = await file.read()
-                print(f"Processing file {i+1}/{len(files)}: {filename} - {len(contents)} bytes")
-                
-                # Validate file size to prevent memory issues
-                MAX_FILE_SIZE = 50 * 1024 * 1024  # 50MB limit
-                if len(contents) > MAX_FILE_SIZE:
-                    print(f"Warning: Skipping large file {filename} ({len(contents)} bytes)")
-                    results.append({
-                        "filename": filename,
-                        "error": "File too large - maximum 50MB",
-                        "detections": [],
-                        "image_size": {"width": 0, "height": 0},
-                        "total_objects": 0,
-                        "class_counts": {}
-                    })
-                    continue
-                
-                nparr = np.frombuffer(contents, np.uint8)
-                img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-                
-                if img is None:
-                    print(f"Warning: Could not decode image {filename}")
-                    results.append({
-                        "filename": filename,
-                        "error": "Invalid image file - could not decode",
-                        "detections": [],
-                        "image_size": {"width": 0, "height": 0},
-                        "total_objects": 0,
-                        "class_counts": {}
-                    })
-                    continue
-                
-                print(f"Image {i+1} decoded successfully - shape: {img.shape}")
-                
-                # Convert BGR to RGB for processing
-                img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-                
-                # Run detection
-                detections = model_manager.detect(model, img_rgb, conf=confidence, class_filter=classes)
-                print(f"Image {i+1} detection completed - found {len(detections)} objects")
-                
-                # Calculate class counts
-                class_counts = {}
-                for det in detections:
-                    cls = det['class']
-                    class_counts[cls] = class_counts.get(cls, 0) + 1
-                
-                results.append({
-                    "filename": filename,
-                    "detections": detections,
-                    "image_size": {
-                        "width": img.shape[1],
-                        "height": img.shape[0]
-                    },
-                    "total_objects": len(detections),
-                    "class_counts": class_counts
-                })
-                
-                # Only create base64 URL for first few images to prevent memory issues
-                if processed_count < 10:
-                    image_files.append({
-                        "filename": filename,
-                        "url": f"data:image/{file_ext.replace('.', '')};base64,{base64.b64encode(contents).decode()}"
-                    })
-                else:
-                    # For remaining images, just return filename
-                    image_files.append({
-                        "filename": filename,
-                        "url": null
-                    })
-                
-                processed_count += 1
-                
-                # Clear memory after processing each image
-                del contents
-                del nparr
-                del img
-                del img_rgb
-                
-            except Exception as e:
-                print(f"Error processing file {filename}: {str(e)}")
-                results.append({
-                    "filename": filename,
-                    "error": str(e),
-                    "detections": [],
-                    "image_size": {"width": 0, "height": 0},
-                    "total_objects": 0,
-                    "class_counts": {}
-                })
+        files = _limit_files(files)
+        params = DetectionParams(model, confidence, parse_class_filter(class_filter),
+                                 precision=precision)
         
-        return {
+        # Only image files take part; everything else in the folder is skipped
+        valid_extensions = ['.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.webp']
+        images = []
+        for file in files:
+            file_ext = os.path.splitext((file.filename or "").lower())[1]
+            if file_ext in valid_extensions:
+                images.append((file, file_ext))
+            else:
+                print(f"Skipping non-image file: {file.filename}")
+        
+        results = await _detect_uploads([file for file, _ in images], params)
+        
+        # Original bytes are served by /api/image instead of echoed back as base64
+        stored = [
+            (result, file, file_ext)
+            for result, (file, file_ext) in zip(results, images) if not result.get("error")
+        ]
+        image_ids = await asyncio.gather(
+            *(asyncio.to_thread(_store_upload, file, file_ext) for _, file, file_ext in stored)
+        )
+        await asyncio.to_thread(_evict_oldest, UPLOAD_DIR, "*", UPLOAD_MAX_FILES, UPLOAD_MAX_BYTES)
+        
+        image_files = [
+            {
+                "filename": result["filename"],
+                "id": image_id,
+                "url": str(request.url_for("get_image", image_id=image_id))
+            }
+            for (result, _, _), image_id in zip(stored, image_ids)
+        ]
+        
+        return ORJSONResponse({
             "results": results,
             "total_files": len(files),
-            "total_images": processed_count,
-            "successful_detections": len([r for r in results if not r.get("error")]),
+            "total_images": len(image_files),
+            "successful_detections": sum(1 for r in results if not r.get("error")),
             "total_objects": sum(r["total_objects"] for r in results),
             "image_files": image_files
-        }
+        })
         
     except Exception as e:
         import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/image/{image_id}", name="get_image")
+async def get_image(image_id: str):
+    """Serve an image stored by /api/detect-folder"""
+    path = UPLOAD_DIR / image_id
+    # Reject ids that would resolve outside the upload directory
+    if Path(image_id).name != image_id or not path.is_file():
+        raise HTTPException(status_code=404, detail="Image not found")
+    return FileResponse(path)
+
+async def _detect_video_batches(reader: VideoReader, video_path: str, model: str,
+                                confidence: float, classes: Optional[frozenset],
+                                frame_interval: int, frame_limit: int, precision: str = "auto"):
+    """
+    Run sampled video frames through detection, yielding each batch's results in order
+    
+    Three stages overlap: a reader thread decodes ahead into a bounded queue,
+    this coroutine batches frames onto the inference thread, and each batch's
+    response entries are built on a worker thread. The reader is closed and
+    the video file deleted when the generator finishes or is closed.
+    """
+    width, height, fps = reader.width, reader.height, reader.fps
+    read_q: queue.Queue = queue.Queue(maxsize=VIDEO_PREFETCH)
+    stop = threading.Event()
+    reader_thread = threading.Thread(
+        target=_read_video_frames,
+        args=(reader, frame_interval, frame_limit, read_q, stop),
+        name="autood-video-reader", daemon=True
+    )
+    aggregations = []
+    batch = []
+    # Host frames for GPU YOLO are staged through pinned memory, overlapping
+    # each batch's copy with the previous batch's inference; BGR -> RGB happens
+    # during the copy into pinned memory
+    uploader = (PinnedFrameUploader(model_manager.device, preprocess=lambda frame: frame[..., ::-1])
+                if model_manager.device.type == "cuda" and model.startswith("yolo/") else None)
+    pending = None
+    
+    async def infer_staged(items, staged, ready):
+        detections_batch = await pipeline.run_inference(
+            model_manager.detect_batch_tensor, model, staged, confidence, classes,
+            VIDEO_BATCH_SIZE, ready
+        )
+        return await asyncio.to_thread(
+            _video_frame_results, items, detections_batch, width, height, fps
+        )
+    
+    async def flush():
+        nonlocal pending
+        frames = [frame for _, frame in batch]
+        if uploader is not None and not isinstance(frames[0], torch.Tensor):
+            staged, ready = await asyncio.to_thread(uploader.upload, frames)
+            staged = staged.permute(0, 3, 1, 2)
+            # Frames are in pinned memory now; one batch stays in flight so the
+            # next upload overlaps it, and the upload ring never gets ahead of it
+            if pending is not None:
+                await pending
+            pending = asyncio.create_task(infer_staged(list(batch), staged, ready))
+            aggregations.append(pending)
+            batch.clear()
+            return
+        if isinstance(frames[0], torch.Tensor):
+            # NVDEC frames stay on the GPU all the way into the model
+            detections_batch = await pipeline.run_inference(
+                model_manager.detect_batch_tensor, model, torch.stack(frames), confidence, classes,
+                VIDEO_BATCH_SIZE
+            )
+        else:
+            detections_batch = await pipeline.run_inference(
+                model_manager.detect_batch, model, frames, confidence, classes, precision
+            )
+        aggregations.append(asyncio.create_task(asyncio.to_thread(
+            _video_frame_results, list(batch), detections_batch, width, height, fps
+        )))
+        # The reader may reuse these frames' buffers once detection returns
+        batch.clear()
+    
+    reader_thread.start()
+    try:
+        while True:
+            item = await asyncio.to_thread(read_q.get)
+            if item is None:
+                break
+            if isinstance(item, Exception):
+                raise item
+            batch.append(item)
+            if len(batch) == VIDEO_BATCH_SIZE:
+                await flush()
+                # Hand over finished batches in order without waiting on later ones
+                while aggregations and aggregations[0].done():
+                    yield aggregations.pop(0).result()
+        
+        if batch:
+            await flush()
+        for task in aggregations:
+            yield await task
+    finally:
+        for task in aggregations:
+            task.cancel()
+        # Unblock and join the reader before its decoder is closed
+        stop.set()
+        while reader_thread.is_alive():
+            try:
+                read_q.get_nowait()
+            except queue.Empty:
+                await asyncio.to_thread(reader_thread.join, 0.1)
+        reader.close()
+        os.unlink(video_path)
+
+async def _video_ndjson(batches, video_properties: Dict[str, Any],
+                       processing_info: Dict[str, Any]):
+    """
+    NDJSON body for streamed video detection
+    
+    One line with the video properties, one {"results": [...]} line per
+    inferred batch as soon as it is ready, then the processing summary.
+    A failure after the response has started is reported as an {"error"} line.
+    """
+    yield orjson.dumps({"video_properties": video_properties}) + b"\n"
+    processed_frames = total_objects = 0
+    try:
+        async for chunk in batches:
+            processed_frames += len(chunk)
+            total_objects += sum(r["total_objects"] for r in chunk)
+            yield orjson.dumps({"results": chunk}) + b"\n"
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        yield orjson.dumps({"error": str(e)}) + b"\n"
+        return
+    yield orjson.dumps({"processing_info": {
+        **processing_info,
+        "processed_frames": processed_frames,
+        "total_objects": total_objects
+    }}) + b"\n"
+
+def _response_to_ndjson(body: bytes) -> bytes:
+    """Replay a cached video response in the streamed NDJSON layout, results as one line"""
+    response = orjson.loads(body)
+    return b"".join(
+        orjson.dumps({key: response[key]}) + b"\n"
+        for key in ("video_properties", "results", "processing_info")
+    )
+
 @app.post("/api/detect-video")
 async def detect_objects_video(
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     model: str = Form("yolo/yolov8n.pt"),
     confidence: float = Form(0.25),
     class_filter: Optional[str] = Form(None),
     frame_interval: int = Form(1),  # Process every N frames
-    max_frames: int = Form(100)     # Maximum frames to process
+    max_frames: int = Form(100),    # Maximum frames to process
+    stream: bool = Form(False),     # Return NDJSON lines as batches complete
+    precision: str = Form("auto")
 ):
     """Detect objects in video file, processing frames at specified intervals"""
     try:
+        _check_precision(precision)
+        
         print(f"Received video detection request - model: {model}, confidence: {confidence}, frame_interval: {frame_interval}, max_frames: {max_frames}")
         
-        # Parse class filter
-        classes = None
-        if class_filter:
-            try:
-                classes = json.loads(class_filter)
-                print(f"Class filter applied: {classes}")
-            except:
-                classes = [c.strip() for c in class_filter.split(",") if c.strip()]
-                print(f"Class filter (parsed): {classes}")
-        
-        # Save uploaded video to temporary file
-        contents = await file.read()
-        
-        # Validate file size to prevent memory issues
-        MAX_VIDEO_SIZE = 200 * 1024 * 1024  # 200MB limit
-        if len(contents) > MAX_VIDEO_SIZE:
+        classes = parse_class_filter(class_filter)
+        
+        # Validate file size before copying it anywhere
+        size = _upload_size(file)
+        if size is not None and size > MAX_VIDEO_SIZE:
             raise HTTPException(status_code=400, detail="Video file too large - maximum 200MB")
         
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.mp4') as tmp_file:
-            tmp_file.write(contents)
-            tmp_video_path = tmp_file.name
+        # Stream the spooled upload to disk; it is never held in memory as bytes
+        try:
+            tmp_video_path, digest = await asyncio.to_thread(_save_video_upload, file)
+        except UploadTooLargeError as e:
+            raise HTTPException(status_code=400, detail=str(e))
         
-        print(f"Video saved to temporary file: {tmp_video_path} - {len(contents)} bytes")
+        print(f"Video saved to temporary file: {tmp_video_path} - {os.path.getsize(tmp_video_path)} bytes")
         
-        # Clear contents from memory
-        del contents
+        cache_key = _video_cache_key(digest, model, confidence, classes, frame_interval, max_frames,
+                                     precision)
+        try:
+            cached = await asyncio.to_thread(_cached_video_response, cache_key)
+        except FileNotFoundError:
+            cached = None
+        if cached is not None:
+            os.unlink(tmp_video_path)
+            print(f"Serving cached video detection results ({cache_key})")
+            if stream:
+                return Response(_response_to_ndjson(cached), media_type="application/x-ndjson")
+            return Response(cached, media_type="application/json")
         
-        # Open video with OpenCV
-        cap = cv2.VideoCapture(tmp_video_path)
-        if not cap.isOpened():
+        try:
+            reader = VideoReader(tmp_video_path, device=model_manager.device)
+        except InvalidVideoError as e:
             os.unlink(tmp_video_path)
-            raise HTTPException(status_code=400, detail="Could not open video file")
+            raise HTTPException(status_code=400, detail=str(e))
         
         # Get video properties
-        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        fps = cap.get(cv2.CAP_PROP_FPS)
-        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        total_frames = reader.total_frames
+        fps = reader.fps
+        width = reader.width
+        height = reader.height
         
         print(f"Video properties - total_frames: {total_frames}, fps: {fps}, width: {width}, height: {height}")
         
-        # Calculate which frames to process
-        frames_to_process = []
-        frame_count = 0
-        processed_count = 0
-        
-        while cap.isOpened() and processed_count < max_frames:
-            ret, frame = cap.read()
-            if not ret:
-                break
-                
-            # Process every Nth frame
-            if frame_count % frame_interval == 0:
-                frames_to_process.append({
-                    "frame_number": frame_count,
-                    "timestamp": frame_count / fps if fps > 0 else 0
-                })
-                processed_count += 1
-            
-            frame_count += 1
-        
-        cap.release()
-        print(f"Will process {len(frames_to_process)} frames")
-        
-        # Process selected frames
-        results = []
-        cap = cv2.VideoCapture(tmp_video_path)
-        
         # Limit maximum frames to prevent memory exhaustion
         MAX_FRAMES = 100
-        if len(frames_to_process) > MAX_FRAMES:
-            print(f"Warning: Too many frames to process ({len(frames_to_process)}), limiting to {MAX_FRAMES}")
-            frames_to_process = frames_to_process[:MAX_FRAMES]
-        
-        for i, frame_info in enumerate(frames_to_process):
-            # Seek to the specific frame
-            cap.set(cv2.CAP_PROP_POS_FRAMES, frame_info["frame_number"])
-            ret, frame = cap.read()
-            
-            if not ret:
-                print(f"Warning: Could not read frame {frame_info['frame_number']}")
-                continue
-            
-            # Convert BGR to RGB
-            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            
-            # Run detection
-            detections = model_manager.detect(model, frame_rgb, conf=confidence, class_filter=classes)
-            print(f"Frame {i+1}/{len(frames_to_process)} (frame {frame_info['frame_number']}) - found {len(detections)} objects")
-            
-            # Calculate class counts
-            class_counts = {}
-            for det in detections:
-                cls = det['class']
-                class_counts[cls] = class_counts.get(cls, 0) + 1
-            
-            results.append({
-                "frame_number": frame_info["frame_number"],
-                "timestamp": frame_info["timestamp"],
-                "detections": detections,
-                "image_size": {
-                    "width": width,
-                    "height": height
-                },
-                "total_objects": len(detections),
-                "class_counts": class_counts
-            })
-            
-            # Clear frame from memory to prevent accumulation
-            del frame
-            del frame_rgb
+        if max_frames > MAX_FRAMES:
+            print(f"Warning: Too many frames requested ({max_frames}), limiting to {MAX_FRAMES}")
+        frame_limit = min(max_frames, MAX_FRAMES)
         
-        cap.release()
-        os.unlink(tmp_video_path)  # Clean up temporary file
+        # Derive the stride from the frame count up front, so the samples cover
+        # the whole clip instead of only its first frame_limit * frame_interval frames
+        frame_interval = max(1, frame_interval)
+        if total_frames > 0 and frame_limit > 0:
+            frame_interval = max(frame_interval, math.ceil(total_frames / frame_limit))
+            print(f"Sampling every {frame_interval} frames")
         
-        return {
+        batches = _detect_video_batches(
+            reader, tmp_video_path, model, confidence, classes, frame_interval, frame_limit,
+            precision
+        )
+        video_properties = {
+            "total_frames": total_frames,
+            "fps": fps,
+            "width": width,
+            "height": height
+        }
+        processing_info = {
+            "frame_interval": frame_interval,
+            "max_frames": max_frames
+        }
+        if stream:
+            return StreamingResponse(
+                _video_ndjson(batches, video_properties, processing_info),
+                media_type="application/x-ndjson"
+            )
+        
+        results = [entry async for chunk in batches for entry in chunk]
+        
+        # Serialized once with orjson (no jsonable_encoder pass), then cached as-is
+        body = orjson.dumps({
             "results": results,
-            "video_properties": {
-                "total_frames": total_frames,
-                "fps": fps,
-                "width": width,
-                "height": height
-            },
+            "video_properties": video_properties,
             "processing_info": {
-                "frame_interval": frame_interval,
-                "max_frames": max_frames,
+                **processing_info,
                 "processed_frames": len(results),
                 "total_objects": sum(r["total_objects"] for r in results)
             }
-        }
+        }, option=orjson.OPT_SERIALIZE_NUMPY)
+        background_tasks.add_task(_store_video_response, cache_key, body)
+        return Response(body, media_type="application/json")
         
+    except HTTPException:
+        raise
     except Exception as e:
         import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/export")
-async def export_annotations(request: ExportRequest, background_tasks: BackgroundTasks):
+async def export_annotations(request: ExportRequest):
     """Export annotations in various formats as a ZIP file"""
     try:
-        # Create a temporary directory for this export
-        with tempfile.TemporaryDirectory() as temp_dir:
-            # Initialize custom exporter for this directory
-            local_exporter = Exporter(export_dir=temp_dir)
-            
-            # Prepare data
-            filename = "image" # Default filename since we handle single image
-            annotations_dict = {filename: request.annotations}
-            image_sizes = {filename: (request.image_size["width"], request.image_size["height"])}
-            
-            # Export requested formats
-            if "YOLO" in request.formats:
-                local_exporter.export_yolo(annotations_dict, image_sizes, request.classes)
-                # This creates 'yolo' folder and 'yolo_annotations.zip' inside temp_dir
-                # We can remove the inner zip to avoid redundancy if we want, or keep it.
-                # Let's keep the folder structure clean.
-            
-            if "CSV" in request.formats:
-                local_exporter.export_csv(annotations_dict)
-            
-            if "JSON" in request.formats:
-                metadata = {
-                    'classes': request.classes,
-                    'total_annotations': len(request.annotations)
-                }
-                local_exporter.export_json(annotations_dict, metadata)
-            
-            if "COCO" in request.formats:
-                local_exporter.export_coco(annotations_dict, image_sizes, request.classes)
-            
-            # Create master zip file
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            zip_filename = f"autood_export_{timestamp}.zip"
-            zip_path = os.path.join(tempfile.gettempdir(), zip_filename)
-            
-            with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                for root, dirs, files in os.walk(temp_dir):
-                    for file in files:
-                        # Skip valid zips generated by sub-routines to avoid nested zips?
-                        # exporter.export_yolo generates a zip.
-                        if file.endswith('.zip'):
-                            continue
-                            
-                        file_path = os.path.join(root, file)
-                        arcname = os.path.relpath(file_path, temp_dir)
-                        zipf.write(file_path, arcname)
-            
-            # Schedule cleanup
-            background_tasks.add_task(os.remove, zip_path)
-            
-            return FileResponse(
-                zip_path,
-                media_type="application/zip",
-                filename=zip_filename
-            )
+        # Prepare data
+        filename = "image" # Default filename since we handle single image
+        annotations_dict = {filename: request.annotations}
+        image_sizes = {filename: (request.image_size["width"], request.image_size["height"])}
+        
+        # Each exporter yields (arcname, bytes) straight into the archive;
+        # nothing is written to disk and read back
+        members = []
+        if "YOLO" in request.formats:
+            members.append(exporter.iter_yolo(annotations_dict, image_sizes, request.classes))
+        
+        if "CSV" in request.formats:
+            members.append(exporter.iter_csv(annotations_dict))
+        
+        if "JSON" in request.formats:
+            metadata = {
+                'classes': request.classes,
+                'total_annotations': len(request.annotations)
+            }
+            members.append(exporter.iter_json(annotations_dict, metadata))
+        
+        if "COCO" in request.formats:
+            members.append(exporter.iter_coco(annotations_dict, image_sizes, request.classes))
+        
+        archive = await asyncio.to_thread(Exporter.write_zip, chain.from_iterable(members))
+        
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        zip_filename = f"autood_export_{timestamp}.zip"
+        
+        return Response(
+            archive,
+            media_type="application/zip",
+            headers={"Content-Disposition": f'attachment; filename="{zip_filename}"'}
+        )
             
     except Exception as e:
         import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
 
+# COCO classes (standard YOLO classes); the response never changes, so it is
+# serialized once
+COCO_CLASSES = (
+    "person", "bicycle", "car", "motorcycle", "airplane", "bus", "train", "truck", "boat",
+    "traffic light", "fire hydrant", "stop sign", "parking meter", "bench", "bird", "cat",
+    "dog", "horse", "sheep", "cow", "elephant", "bear", "zebra", "giraffe", "backpack",
+    "umbrella", "handbag", "tie", "suitcase", "frisbee", "skis", "snowboard", "sports ball",
+    "kite", "baseball bat", "baseball glove", "skateboard", "surfboard", "tennis racket",
+    "bottle", "wine glass", "cup", "fork", "knife", "spoon", "bowl", "banana", "apple",
+    "sandwich", "orange", "broccoli", "carrot", "hot dog", "pizza", "donut", "cake", "chair",
+    "couch", "potted plant", "bed", "dining table", "toilet", "tv", "laptop", "mouse", "remote",
+    "keyboard", "cell phone", "microwave", "oven", "toaster", "sink", "refrigerator", "book",
+    "clock", "vase", "scissors", "teddy bear", "hair drier", "toothbrush"
+)
+_CLASSES_RESPONSE = orjson.dumps({"classes": COCO_CLASSES, "total": len(COCO_CLASSES)})
+
 @app.get("/api/classes")
 async def get_available_classes():
     """Get available object classes from YOLO model"""
-    try:
-        # Get COCO classes (standard YOLO classes)
-        coco_classes = [
-            "person", "bicycle", "car", "motorcycle", "airplane", "bus", "train", "truck", "boat",
-            "traffic light", "fire hydrant", "stop sign", "parking meter", "bench", "bird", "cat",
-            "dog", "horse", "sheep", "cow", "elephant", "bear", "zebra", "giraffe", "backpack",
-            "umbrella", "handbag", "tie", "suitcase", "frisbee", "skis", "snowboard", "sports ball",
-            "kite", "baseball bat", "baseball glove", "skateboard", "surfboard", "tennis racket",
-            "bottle", "wine glass", "cup", "fork", "knife", "spoon", "bowl", "banana", "apple",
-            "sandwich", "orange", "broccoli", "carrot", "hot dog", "pizza", "donut", "cake", "chair",
-            "couch", "potted plant", "bed", "dining table", "toilet", "tv", "laptop", "mouse", "remote",
-            "keyboard", "cell phone", "microwave", "oven", "toaster", "sink", "refrigerator", "book",
-            "clock", "vase", "scissors", "teddy bear", "hair drier", "toothbrush"
-        ]
-        
-        return {
-            "classes": coco_classes,
-            "total": len(coco_classes)
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return Response(_CLASSES_RESPONSE, media_type="application/json")
 
 from fastapi.staticfiles import StaticFiles
 import os
@@ -0,0 +1,80 @@
+"""Vectorized and Numba IoU paths must match the scalar IoU merge_annotations used to run"""
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("torch")
+from core._iou_kernels import NUMBA_AVAILABLE, pairwise_iou
+from core.auto_labeler import AutoLabeler
+
+
+def _baseline_iou(bbox1, bbox2):
+    x1_1, y1_1, x2_1, y2_1 = bbox1
+    x1_2, y1_2, x2_2, y2_2 = bbox2
+    x1_i = max(x1_1, x1_2)
+    y1_i = max(y1_1, y1_2)
+    x2_i = min(x2_1, x2_2)
+    y2_i = min(y2_1, y2_2)
+    if x2_i < x1_i or y2_i < y1_i:
+        return 0.0
+    intersection = (x2_i - x1_i) * (y2_i - y1_i)
+    area1 = (x2_1 - x1_1) * (y2_1 - y1_1)
+    area2 = (x2_2 - x1_2) * (y2_2 - y1_2)
+    union = area1 + area2 - intersection
+    return intersection / union if union > 0 else 0.0
+
+
+BOXES = [
+    [0, 0, 10, 10],
+    [10, 0, 20, 10],     # shares the right edge of the first box
+    [10, 10, 20, 20],    # touches the first box at a corner
+    [5, 5, 15, 15],
+    [0, 0, 10, 10],      # identical to the first box
+    [3, 3, 3, 3],        # zero-area point inside the first box
+    [3, 3, 3, 3],        # the same point again: union is zero
+    [2, 0, 8, 0],        # zero-height line on the first box's edge
+    [100, 100, 101.5, 102.25],
+]
+
+
+def _expected():
+    return np.array([[_baseline_iou(a, b) for b in BOXES] for a in BOXES])
+
+
+def test_scalar_iou_matches_baseline():
+    got = np.array([[AutoLabeler._calculate_iou(a, b) for b in BOXES] for a in BOXES])
+    np.testing.assert_allclose(got, _expected())
+
+
+def test_pairwise_iou_matches_baseline():
+    boxes = np.array(BOXES, dtype=np.float64)
+    got = AutoLabeler._pairwise_iou(boxes, boxes)
+    assert not np.isnan(got).any()
+    np.testing.assert_allclose(got, _expected())
+
+
+@pytest.mark.skipif(not NUMBA_AVAILABLE, reason="requires numba")
+def test_numba_iou_matches_baseline():
+    boxes = np.array(BOXES, dtype=np.float64)
+    got = pairwise_iou(boxes, boxes, np.empty((len(BOXES), len(BOXES))))
+    np.testing.assert_allclose(got, _expected())
+
+
+def _baseline_merge(auto, manual):
+    return manual + [
+        det for det in auto
+        if not any(_baseline_iou(det["bbox"], m["bbox"]) > 0.5 for m in manual)
+    ]
+
+
+def test_merge_annotations_matches_baseline():
+    rng = np.random.default_rng(0)
+    corners = rng.uniform(0, 200, (120, 2))
+    sizes = rng.uniform(0, 40, (120, 2))
+    bboxes = np.hstack([corners, corners + sizes]).tolist() + BOXES
+    auto = [{"class": "car", "bbox": bbox} for bbox in bboxes]
+    manual = [{"class": "car", "bbox": bbox} for bbox in bboxes[::7]]
+
+    labeler = AutoLabeler(None)
+    # Enough pairs for the array path, then few enough for the scalar path
+    assert labeler.merge_annotations(auto, manual) == _baseline_merge(auto, manual)
+    assert labeler.merge_annotations(auto[:5], manual[:2]) == _baseline_merge(auto[:5], manual[:2])
@@ -0,0 +1,93 @@
+"""Generated YOLO and COCO exports must match the per-detection loops they replaced"""
+import json
+
+import pytest
+
+pytest.importorskip("numpy")
+from core.exporter import Exporter
+
+CLASS_NAMES = ["person", "car"]
+IMAGE_SIZES = {"a.jpg": (640, 480), "b.png": (1920, 1080), "empty.jpg": (100, 100)}
+ANNOTATIONS = {
+    "a.jpg": [
+        {"class": "person", "bbox": [10, 20, 110, 220], "confidence": 0.9},
+        {"class": "car", "bbox": [0.5, 1.25, 639.5, 479], "confidence": 0.4},
+        # Unknown classes fall back to the first id
+        {"class": "truck", "bbox": [100, 100, 100, 150], "confidence": 0.3},
+    ],
+    "b.png": [
+        {"class": "car", "bbox": [400.3, 200.7, 980.1, 640.9], "confidence": 0.8,
+         "shape": "polygon", "polygon_points": [[400.3, 200.7], [980.1, 220], [700, 640.9]]},
+    ],
+    "empty.jpg": [],
+}
+
+
+def _baseline_yolo_labels(dets, image_size, class_to_id):
+    width, height = image_size
+    lines = []
+    for det in dets:
+        x1, y1, x2, y2 = det['bbox']
+        x_center = ((x1 + x2) / 2) / width
+        y_center = ((y1 + y2) / 2) / height
+        w = (x2 - x1) / width
+        h = (y2 - y1) / height
+        class_id = class_to_id.get(det['class'], 0)
+        lines.append(f"{class_id} {x_center:.6f} {y_center:.6f} {w:.6f} {h:.6f}\n")
+    return "".join(lines)
+
+
+def _baseline_coco(annotations, image_sizes, class_names):
+    class_to_id = {name: idx + 1 for idx, name in enumerate(class_names)}
+    coco_data = {
+        'images': [],
+        'annotations': [],
+        'categories': [{'id': idx + 1, 'name': name, 'supercategory': 'object'}
+                       for idx, name in enumerate(class_names)]
+    }
+    annotation_id = 1
+    for img_id, (filename, dets) in enumerate(annotations.items(), 1):
+        width, height = image_sizes[filename]
+        coco_data['images'].append({'id': img_id, 'file_name': filename,
+                                    'width': width, 'height': height})
+        for det in dets:
+            x1, y1, x2, y2 = det['bbox']
+            annotation = {
+                'id': annotation_id,
+                'image_id': img_id,
+                'category_id': class_to_id.get(det['class'], 1),
+                'bbox': [x1, y1, x2 - x1, y2 - y1],
+                'area': (x2 - x1) * (y2 - y1),
+                'iscrowd': 0
+            }
+            if det.get('shape') == 'polygon' and 'polygon_points' in det:
+                annotation['segmentation'] = [[c for p in det['polygon_points'] for c in p[:2]]]
+            else:
+                annotation['segmentation'] = [[x1, y1, x2, y1, x2, y2, x1, y2]]
+            coco_data['annotations'].append(annotation)
+            annotation_id += 1
+    return coco_data
+
+
+def test_yolo_labels_match_baseline():
+    members = dict(Exporter().iter_yolo(ANNOTATIONS, IMAGE_SIZES, CLASS_NAMES))
+    class_to_id = {name: idx for idx, name in enumerate(CLASS_NAMES)}
+    for filename, dets in ANNOTATIONS.items():
+        stem = filename.rsplit(".", 1)[0]
+        expected = _baseline_yolo_labels(dets, IMAGE_SIZES[filename], class_to_id)
+        assert members[f"yolo/{stem}.txt"].decode() == expected
+    assert members["yolo/classes.txt"] == b"person\ncar\n"
+
+
+@pytest.mark.parametrize("pretty", [True, False])
+def test_coco_matches_baseline(pretty):
+    (arcname, data), = Exporter().iter_coco(ANNOTATIONS, IMAGE_SIZES, CLASS_NAMES, pretty)
+    assert arcname == "coco_annotations.json"
+    assert json.loads(data) == _baseline_coco(ANNOTATIONS, IMAGE_SIZES, CLASS_NAMES)
+
+
+def test_export_yolo_writes_every_member(tmp_path):
+    exporter = Exporter(str(tmp_path))
+    exporter.export_yolo(ANNOTATIONS, IMAGE_SIZES, CLASS_NAMES)
+    for arcname, data in exporter.iter_yolo(ANNOTATIONS, IMAGE_SIZES, CLASS_NAMES):
+        assert (tmp_path / arcname).read_bytes() == data
@@ -0,0 +1,74 @@
+"""Upload parsing and response helpers in main must agree with the code they replaced"""
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+cv2 = pytest.importorskip("cv2")
+main = pytest.importorskip("main")
+
+TEST_IMAGE = Path(__file__).resolve().parents[2] / "test.jpg"
+
+# APP1 segment with an empty little-endian TIFF directory, as cameras write before the frame header
+EXIF_APP1 = (b"\xff\xe1" + (22).to_bytes(2, "big") + b"Exif\x00\x00"
+             + b"II*\x00\x08\x00\x00\x00" + b"\x00\x00" + b"\x00\x00\x00\x00")
+
+
+def _encode(width, height, progressive=False):
+    image = np.random.default_rng(0).integers(0, 256, (height, width, 3), dtype=np.uint8)
+    ok, buf = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_PROGRESSIVE, int(progressive)])
+    assert ok
+    return buf.tobytes()
+
+
+def _decoded_size(contents):
+    # What the size used to come from: a full decode, before any EXIF rotation
+    flags = cv2.IMREAD_COLOR | cv2.IMREAD_IGNORE_ORIENTATION
+    image = cv2.imdecode(np.frombuffer(contents, np.uint8), flags)
+    return image.shape[1], image.shape[0]
+
+
+@pytest.mark.parametrize("size", [(640, 480), (37, 1201)])
+@pytest.mark.parametrize("progressive", [False, True])
+@pytest.mark.parametrize("exif", [False, True])
+def test_jpeg_size_matches_decode(size, progressive, exif):
+    contents = _encode(*size, progressive=progressive)
+    if exif:
+        contents = contents[:2] + EXIF_APP1 + contents[2:]
+    assert main._jpeg_size(contents) == _decoded_size(contents) == size
+
+
+def test_jpeg_size_of_camera_jpeg():
+    contents = TEST_IMAGE.read_bytes()
+    assert main._jpeg_size(contents) == _decoded_size(contents)
+
+
+def test_jpeg_size_rejects_other_formats():
+    ok, png = cv2.imencode(".png", np.zeros((8, 8, 3), dtype=np.uint8))
+    assert main._jpeg_size(png.tobytes()) is None
+    assert main._jpeg_size(b"\xff\xd8") is None
+
+
+def test_decode_flags_keep_model_resolution():
+    yolo = main._model_input_size("yolo/yolov8n.pt")
+    rcnn = main._model_input_size("torchvision/fasterrcnn_resnet50_fpn")
+    assert main._decode_flags((2000, 1500), yolo) == cv2.IMREAD_REDUCED_COLOR_2
+    assert main._decode_flags((2000, 1500), rcnn) == cv2.IMREAD_COLOR
+    assert main._decode_flags(None, yolo) == cv2.IMREAD_COLOR
+
+
+def test_class_counts_sum_shared_names():
+    # torchvision's COCO categories map several ids to "N/A"
+    names = {0: "person", 3: "motorcycle", 12: "N/A", 26: "N/A"}
+    class_ids = np.array([0, 12, 12, 26, 0, 3])
+    detections = main.MultiModelManager._to_detections(
+        np.zeros((len(class_ids), 4)), np.ones(len(class_ids)),
+        [names[i] for i in class_ids.tolist()], None, None, class_ids
+    )
+
+    expected = {}
+    for name in detections["classes"]:
+        expected[name] = expected.get(name, 0) + 1
+    counts = main.class_counts(detections)
+    assert list(counts.items()) == list(expected.items())
+    assert main.class_counts(main.MultiModelManager._no_detections()) == {}